@@ -1,18 +1,30 @@
+import time
+_startup_t0 = time.perf_counter()
 import pygame
 import numpy as np
-import pyaudio
 import asyncio
-from shazamio import Shazam
-import requests
+import contextlib
 import os
 import json
 import threading
-import sounddevice as sd
-import soundfile as sf
-import pylast
-import time
 import datetime
 from setup_server import start_setup_server, generate_qr_surface, credentials_updated
+from audio_capture import AudioCapture, audio_profile, encode_wav
+from recognition import RecognitionWorker, RecognitionGate, ClipRace
+from spectrum import SpectrumAnalyzer
+from fingerprint import FingerprintIndex
+from scrobble_queue import ScrobbleQueue
+from history import ListeningHistory, track_key
+from track_change import TrackChangeDetector
+from play_counts import PlayCountCache
+from cover_cache import CoverArtCache
+from text_strips import TextStripCache, TextScroller
+from scheduler import FrameScheduler, WorkerPool
+from sprites import RotationSprites
+from bar_renderer import BarRenderer
+from metrics import MetricsRegistry
+from quality import QualityGovernor, TIERS, tier_index
+from startup import StartupTimer
 
 
 # Load configuration from a JSON file
@@ -24,6 +36,26 @@ def load_config():
 
 config = load_config()
 
+# Per-phase startup times; the first frame should be up within the budget
+startup = StartupTimer(_startup_t0, budget=config['gui'].get('startup_budget_ms', 2000) / 1000)
+startup.mark('imports + config')
+
+# Periodic UI work runs on the render thread; network calls go to the worker
+# pool, and sprite builds to their own so they never wait behind a timeout
+scheduler = FrameScheduler()
+worker_pool = WorkerPool(max_workers=4, name='io')
+sprite_pool = WorkerPool(max_workers=1, name='sprites')
+
+# Counters and histograms, served by the setup server at /metrics
+metrics = MetricsRegistry()
+frame_seconds = metrics.histogram('frame_seconds', "Render work per frame")
+frame_interval_seconds = metrics.histogram('frame_interval_seconds', "Time between frames")
+bands_seconds = metrics.histogram('bands_seconds', "get_frequency_bands latency")
+recognitions = metrics.counter('recognitions_total', "Recognitions by source and result")
+track_change_count = metrics.counter('track_changes_total', "Likely track changes that triggered recognition")
+recognition_skips = metrics.counter('recognition_skips_total', "Clips the gate kept from Shazam")
+metrics.gauge('startup_first_frame_seconds', "Process start to first frame", lambda: startup.first_frame)
+
 # Initialize Pygame
 pygame.init()
 
@@ -42,8 +74,22 @@ else:
     HEIGHT = config['gui']['screen_height']
     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.DOUBLEBUF)
 pygame.display.set_caption("ScrobbleDaddy")
-
-NUM_BARS = 48
+startup.mark('display')
+
+# Quality tier: frame rate, bar count, reflection, vinyl steps and FFT size.
+# gui.quality is "auto" (governed by frame time and CPU load) or a tier name
+quality_setting = config['gui'].get('quality', 'auto')
+quality_governor = None
+try:
+    quality = TIERS[tier_index(quality_setting)]
+except ValueError:
+    if quality_setting != 'auto':
+        print(f"Unknown quality {quality_setting!r}, using auto")
+    quality_governor = QualityGovernor(start=tier_index('medium' if IS_PI else 'high'))
+    quality = quality_governor.tier
+metrics.gauge('quality_tier', "Current quality tier, 0 = best", lambda: tier_index(quality.name))
+
+NUM_BARS = quality.bars
 
 last_track_title = ""
 last_artist_name = ""
@@ -61,67 +107,169 @@ LEFT_PANEL_W = 400
 ART_SIZE = 350
 ART_X = (LEFT_PANEL_W - ART_SIZE) // 2
 ART_Y = max(50, (HEIGHT - ART_SIZE - 120) // 2)  # Centered with room for text below
+INFO_Y = ART_Y + ART_SIZE + 20
 BAR_GAP = 3
 
 # Fonts
 font_title = pygame.font.SysFont("Arial", 28, bold=True)
 font_artist = pygame.font.SysFont("Arial", 22)
 font_small = pygame.font.SysFont("Arial", 16)
+startup.mark('fonts')
 
 # Image cache (avoid reloading from disk every frame)
 cached_album_art = None
 cached_album_art_path = None
 cached_lastfm_img = None
 
-# Pre-allocate surfaces with convert() for fast blitting
-bar_surface = pygame.surface.Surface((WIDTH - LEFT_PANEL_W, HEIGHT // 2)).convert()
-reflection_surface = pygame.surface.Surface((WIDTH - LEFT_PANEL_W, HEIGHT // 2)).convert()
-
 # Adaptive FPS
-TARGET_FPS = 45 if IS_PI else 60
-
-# Equalizer smoothing state
-prev_bands = None
+TARGET_FPS = quality.fps
 
 # Vinyl record state
 cached_vinyl = None
 vinyl_angle = 0
 VINYL_SIZE = 120
 VINYL_SPEED = 270.0 / TARGET_FPS  # 45 RPM
-cached_rotated_vinyl = None
-vinyl_frame_counter = 0
-
-chunk_size = 30
-track_start_index = 0
-artist_start_index = 0
-
-# Pre-compute bar colors (purple → magenta → hot pink gradient)
-bar_colors = []
-for _i in range(NUM_BARS):
-    t = _i / max(NUM_BARS - 1, 1)
-    if t < 0.5:
-        _t2 = t * 2
-        r = int(100 + (180 - 100) * _t2)
-        g = int(40 + (40 - 40) * _t2)
-        b = int(200 + (180 - 200) * _t2)
-    else:
-        _t2 = (t - 0.5) * 2
-        r = int(180 + (255 - 180) * _t2)
-        g = int(40 + (60 - 40) * _t2)
-        b = int(180 + (140 - 180) * _t2)
-    bar_colors.append((r, g, b))
-
-p = pyaudio.PyAudio()
-
-# Open the audio stream for input
-stream = p.open(format=pyaudio.paInt16, channels=1, rate=config['audio']['sample_rate'], input=True, frames_per_buffer=config['audio']['chunk_size'])
+VINYL_CENTER = (WIDTH - VINYL_SIZE // 2 - 20, HEIGHT - VINYL_SIZE // 2 - 10)
+QR_VINYL_SIZE = 300
+QR_VINYL_CENTER = (WIDTH - QR_VINYL_SIZE // 2 - 20, HEIGHT - QR_VINYL_SIZE // 2 - 10)
+
+# Pre-rotated vinyl frames (one set per album, plus the QR vinyl)
+vinyl_sprites = RotationSprites(frames=quality.vinyl_frames)
+qr_vinyl_sprites = RotationSprites(frames=45)
+qr_vinyl_built = False
+
+# Title/artist strips: rendered once per track, scrolled by pixel offset
+TEXT_MARGIN = 20
+TEXT_VIEW_W = LEFT_PANEL_W - 2 * TEXT_MARGIN
+text_strips = TextStripCache(max_entries=16)
+title_scroller = TextScroller(TEXT_VIEW_W)
+artist_scroller = TextScroller(TEXT_VIEW_W)
+scrolled_strips = (None, None)
+
+def make_bar_colors(count):
+    """Bar colors for `count` bars (purple → magenta → hot pink gradient)."""
+    colors = []
+    for i in range(count):
+        t = i / max(count - 1, 1)
+        if t < 0.5:
+            _t2 = t * 2
+            r = int(100 + (180 - 100) * _t2)
+            g = int(40 + (40 - 40) * _t2)
+            b = int(200 + (180 - 200) * _t2)
+        else:
+            _t2 = (t - 0.5) * 2
+            r = int(180 + (255 - 180) * _t2)
+            g = int(40 + (60 - 40) * _t2)
+            b = int(180 + (140 - 180) * _t2)
+        colors.append((r, g, b))
+    return colors
+
+def make_bar_renderer():
+    """Bars and their reflection, drawn in one NumPy pass into one surface."""
+    return BarRenderer(WIDTH - LEFT_PANEL_W, HEIGHT, make_bar_colors(NUM_BARS), BG_COLOR,
+                       gap=BAR_GAP, reflection=quality.reflection)
+
+bar_renderer = make_bar_renderer()
+
+# Per-platform capture settings (sample rate, block size, device, decimation)
+audio_settings = audio_profile(config['audio'], IS_PI)
+
+def visual_fft_size(tier):
+    """The tier's FFT window, scaled to the decimated visualizer rate."""
+    size = max(256, tier.fft_size // audio_settings['decimate'])
+    return 1 << (size.bit_length() - 1)  # Largest power of two that fits
+
+# Visualizer FFT window, in samples of the (decimated) visualizer signal
+fft_size = visual_fft_size(quality)
+
+# Visualizer analysis: an overlapping STFT every hop, smoothed per hop (see
+# spectrum.py), so the bars move the same at any frame rate
+visual_rate = audio_settings['sample_rate'] // audio_settings['decimate']
+spectrum_options = {
+    'hop': max(1, round(visual_rate * config['audio'].get('hop_ms', 10) / 1000)),
+    'attack': config['gui'].get('bar_attack_ms', 20) / 1000,
+    'release': config['gui'].get('bar_release_ms', 250) / 1000,
+    'peak_hold': config['gui'].get('peak_hold_ms', 500) / 1000,
+}
+spectrum = SpectrumAnalyzer(fft_size, visual_rate, NUM_BARS, **spectrum_options)
+spectrum_thread = None
+spectrum_stop = threading.Event()
+startup.mark('visualizer')
 
 # Set environment variable for ALSA
 os.environ['PA_ALSA_PLUGHW'] = '1'
 
+# Shared audio ring — opened by start_services(), or replaced by a synthetic
+# source in benchmarks/render_pipeline.py
+capture = None
+
+# audio.analysis = "process": capture + FFT run in a child process and the
+# render loop only reads the bands it publishes in shared memory
+analysis = None
+
+def open_audio():
+    """Open the mic once — the visualizer and the recognizer both read from this ring."""
+    if config['audio'].get('analysis', 'thread') == 'process' and start_analysis_process():
+        return
+    open_capture()
+
+def start_analysis_process():
+    """Capture and FFT in a child process; False (after saying why) if that can't run here."""
+    global capture, analysis
+    if not IS_PI:
+        print("Process analysis needs fork (Linux); analysing on the render thread")
+        return False
+    try:
+        # Only imported when asked for: multiprocessing.shared_memory is Python 3.8+
+        from analysis import AnalysisProcess
+    except ImportError as e:
+        print(f"Process analysis unavailable ({e}); analysing on the render thread")
+        return False
+
+    try:
+        analysis = AnalysisProcess(
+            sample_rate=audio_settings['sample_rate'],
+            chunk_size=audio_settings['chunk_size'],
+            seconds=config['audio']['record_seconds'],
+            channels=audio_settings['channels'],
+            device=audio_settings['device'],
+            decimate=audio_settings['decimate'],
+            num_bars=NUM_BARS,
+            fft_size=fft_size,
+            spectrum_options=spectrum_options,
+        ).start()
+    except Exception as e:
+        print(f"Could not start audio analysis process: {e}")
+        analysis = None
+        return False
+    capture = analysis.audio
+    return True
+
+def open_capture():
+    """Capture on a PyAudio callback thread, with the analyzer on its own thread."""
+    global capture
+    try:
+        source = AudioCapture(
+            sample_rate=audio_settings['sample_rate'],
+            chunk_size=audio_settings['chunk_size'],
+            seconds=config['audio']['record_seconds'],
+            channels=audio_settings['channels'],
+            device=audio_settings['device'],
+            decimate=audio_settings['decimate'],
+        ).start()
+    except Exception as e:
+        print(f"Could not open audio input: {e}")
+        capture = None
+        return
+    # Published only once its analyzer thread runs, so the render loop never
+    # sees a capture without one and calls spectrum.update() alongside it
+    start_spectrum_thread(source)
+    capture = source
+
 # Initialize Last.fm network (optional — runs without it)
 network = None
 lastfm_enabled = False
+setup_url = None
 setup_server = None
 setup_qr_surface = None
 
@@ -132,6 +280,7 @@ def connect_lastfm():
     if (config['lastfm']['api_key'] and config['lastfm']['api_secret']
             and config['lastfm']['username'] and config['lastfm']['password']):
         try:
+            import pylast
             network = pylast.LastFMNetwork(
                 api_key=config['lastfm']['api_key'],
                 api_secret=config['lastfm']['api_secret'],
@@ -140,20 +289,46 @@ def connect_lastfm():
             )
             lastfm_enabled = True
             print(f"Last.fm connected as: {config['lastfm']['username']}")
+            if scrobble_queue is not None:
+                scrobble_queue.wake()
             return True
         except Exception as e:
             print(f"Last.fm connection failed: {e}")
     return False
 
-# Try initial connection
-connect_lastfm()
-
-# Always start setup server (for QR setup anytime)
-setup_url, setup_server = start_setup_server(
-    os.path.join(os.getcwd(), 'config.json')
+# Durable scrobble queue — scrobbles are saved first, sent in the background
+scrobble_queue = ScrobbleQueue(
+    config.get('scrobbling', {}).get('queue_db', 'scrobbles.db'),
+    batch_size=config.get('scrobbling', {}).get('batch_size', 50),
+    max_backoff=config.get('scrobbling', {}).get('max_backoff', 900),
+    metrics=metrics,
 )
-setup_qr_surface = generate_qr_surface(setup_url)
-show_qr = False  # Toggle with button click
+
+# Every recognition attempt (hit, repeat, miss, skip), served by the setup server
+history = ListeningHistory(config.get('recognition', {}).get('history_db', 'history.db'))
+
+def record_history(outcome, result=None, **details):
+    try:
+        history.record(outcome, result, **details)
+    except Exception as e:
+        print(f"Could not record listening history: {e}")
+
+def flush_scrobbles():
+    """Hand the next due scrobble batch to the worker pool."""
+    if lastfm_enabled and scrobble_queue.due():
+        worker_pool.submit_once('scrobble', scrobble_queue.flush_once, network)
+
+def reconnect_lastfm():
+    if connect_lastfm():
+        invalidate_album_cache()
+
+def check_credentials():
+    """Pick up credentials submitted via QR setup."""
+    if credentials_updated.is_set():
+        credentials_updated.clear()
+        worker_pool.submit_once('lastfm', reconnect_lastfm)
+
+show_qr = False  # Toggled by tapping the record
 
 duration = 10  # seconds
 
@@ -161,32 +336,93 @@ isRecording = False
 
 def record_audio():
     global isRecording
-    samplerate = 44100
-    filename = 'output.wav'
+
+    if capture is None:
+        return None
 
     isRecording = True
     try:
         print(f"Recording {config['audio']['record_seconds']}s...")
-        mydata = sd.rec(int(samplerate * config['audio']['record_seconds']),
-                        samplerate=samplerate, channels=1, blocking=True)
-        sf.write(filename, mydata, samplerate)
-        print(f"Recording saved to {filename}")
+        mydata = capture.record(config['audio']['record_seconds'])
+        if mydata is None:
+            raise RuntimeError("audio input stalled")
         isRecording = False
-        return filename
+        return mydata
     except Exception as e:
         print(f"Recording error: {e}")
         isRecording = False
         return None
 
-async def recognize_song(wav_file):
-    shazam = Shazam()
+async def recognize_song(samples):
+    shazam = recognizer.shazam
 
     try:
-        return await shazam.recognize(wav_file)
+        wav_bytes = encode_wav(samples, capture.sample_rate)
+        # Optional debug dump — off by default to spare the SD card
+        dump_path = config['audio'].get('debug_dump_path')
+        if dump_path:
+            with open(dump_path, 'wb') as f:
+                f.write(wav_bytes)
+        with recognizer.latency.timed('shazam'):
+            return await shazam.recognize(wav_bytes)
+    except asyncio.CancelledError:
+        raise  # A lost clip race; an Exception before 3.8, so let it through
     except Exception as e:
         print(f"Error recognizing song: {e}")
     return None
 
+def identify_locally(samples):
+    """Check the local fingerprint index before going to the network."""
+    if fingerprint_index is None:
+        return None
+
+    try:
+        with recognizer.latency.timed('local_lookup'):
+            match = fingerprint_index.lookup(samples)
+    except Exception as e:
+        print(f"Local fingerprint lookup failed: {e}")
+        return None
+
+    if match is None:
+        return None
+    result, score, seconds = match
+    print(f"Identified locally ({score} landmarks in {seconds * 1000:.0f}ms)")
+    return result, score
+
+def remember_fingerprint(result, samples):
+    """Add a clip Shazam just matched to the local fingerprint index."""
+    if fingerprint_index is None:
+        return
+
+    try:
+        fingerprint_index.add(result, samples)
+    except Exception as e:
+        print(f"Could not store fingerprint: {e}")
+
+def fetch_play_count(artist_name, track_title):
+    """Ask Last.fm for the user's play count (runs on the cache's refresh thread)."""
+    import pylast
+    track = pylast.Track(
+        artist=artist_name, title=track_title, network=network, username=config["lastfm"]["username"]
+    )
+    with recognizer.latency.timed('lastfm_playcount'):
+        return track.get_userplaycount()
+
+def on_play_count(artist_name, track_title, count):
+    global last_track_play_count
+    if artist_name == last_artist_name and track_title == last_track_title:
+        last_track_play_count = count
+        print(last_track_play_count, "playcount")
+
+# Play counts by (artist, title) — shown instantly, refreshed in the background
+play_counts = PlayCountCache(
+    fetch_play_count,
+    ttl=config.get('scrobbling', {}).get('play_count_ttl', 3600),
+    executor=worker_pool,
+)
+play_counts.on_update = on_play_count
+scrobble_queue.on_sent = play_counts.increment
+
 def song_play_count(result):
     global last_track_play_count
 
@@ -196,15 +432,8 @@ def song_play_count(result):
     track_title = result['track']['title']
     artist_name = result['track']['subtitle']
 
-    track = pylast.Track(
-        artist=artist_name, title=track_title, network=network, username=config["lastfm"]["username"]
-    )
-
-    try:
-        last_track_play_count = track.get_userplaycount()
-    except Exception as e:
-        print(f"Error getting play count: {e}")
-    print(last_track_play_count, "playcount")
+    # Cached (possibly stale) value now; a refresh updates it via on_play_count
+    last_track_play_count = play_counts.get(artist_name, track_title)
 
 def scrobbleMeDaddy(result):
     if not lastfm_enabled:
@@ -224,9 +453,10 @@ def scrobbleMeDaddy(result):
     unix_timestamp = int(time.mktime(datetime.datetime.now().timetuple()))
     print(f"Scrobbling: {artist} - {title} (Timestamp: {unix_timestamp})")
 
-    network.scrobble(artist=artist, title=title, timestamp=unix_timestamp)
+    scrobble_queue.enqueue(artist, title, unix_timestamp, album=album)
 
 def update_gui(result):
+    """Show a recognized track; True when it's a new one (and was scrobbled)."""
     global last_track_title, last_artist_name, last_cover_art_url
 
     if 'track' in result:
@@ -240,139 +470,278 @@ def update_gui(result):
             last_cover_art_url = cover_art_url
 
             if cover_art_url:
-                response = requests.get(cover_art_url, timeout=config['network']['timeout'])
-                image_data = response.content
-                with open('image.jpg', 'wb') as f:
-                    f.write(image_data)
-                invalidate_album_cache()
+                cover_cache.fetch(cover_art_url, on_cover_ready)
 
             scrobbleMeDaddy(result)
             song_play_count(result)
             print(last_track_title, last_artist_name)
-
+            return True
 
         else:
 
             print("No changes detected, skipping GUI update.")
     else:
         print("Could not recognize the song.")
+    return False
+
+def on_cover_ready(url, path):
+    """Show newly cached art, unless the track changed again meanwhile."""
+    global current_cover_path
+    if url == last_cover_art_url:
+        current_cover_path = path
+        invalidate_album_cache()
+
+async def identify(samples):
+    """Local fingerprint index first, then Shazam; returns (result, source, score)."""
+    local = identify_locally(samples)
+    if local is not None:
+        recognitions.inc(source='local', result='hit')
+        return local[0], 'local', local[1]
+    result = await recognize_song(samples)
+    matched = bool(result) and 'track' in result
+    recognitions.inc(source='shazam', result='hit' if matched else 'miss')
+    return result, 'shazam', None
+
+def answer_track(answer):
+    """Track key an identify() answer names, or None for a miss."""
+    result = answer[0]
+    return track_key(result['track']) if result and 'track' in result else None
+
+def finish_recognition(answer, samples, seconds, mode):
+    """Show, remember and log an identify() answer reached `seconds` after
+    recording began; returns True for a match."""
+    result, source, score = answer
+    matched = bool(result) and 'track' in result
+    if matched:
+        # identify_fixed vs identify_race: compare medians in the latency report
+        recognizer.latency.record(f'identify_{mode}', seconds)
+        if source == 'shazam':
+            remember_fingerprint(result, samples)
+    new_track = False
+    if result:
+        print("Song recognized successfully")
+        new_track = update_gui(result)
+    recognition_gate.record_result(samples, matched=matched)
+    outcome = ('hit' if new_track else 'duplicate') if matched else 'miss'
+    record_history(outcome, result, source=source, score=score, latency=seconds)
+    return matched
+
+async def idle_until_change():
+    """After a match, wait for a likely track change (or change_idle_seconds) instead of re-checking."""
+    if track_changes is not None:
+        await recognizer.sleep(config.get('recognition', {}).get('change_idle_seconds', 60))
+
+async def skip_recognition(reason):
+    recognition_skips.inc(reason=reason)
+    record_history('skipped', reason=reason)
+    print(f"Skipping recognition ({reason}), next check in {recognition_gate.delay:.0f}s")
+    await recognizer.sleep(recognition_gate.delay)
 
 async def update_song_information():
-    wav_file = record_audio()
-    if wav_file is not None:
-        result = await recognize_song(wav_file)
-        if result:
-            print("Song recognized successfully")
-            update_gui(result)
+    if clip_race is not None:
+        await race_song_information()
+        return
+
+    start = time.perf_counter()
+    samples = record_audio()
+    if samples is not None:
+        should_recognize, reason = recognition_gate.check(samples)
+        if not should_recognize:
+            await skip_recognition(reason)
+            return
+        answer = await identify(samples)
+        if finish_recognition(answer, samples, time.perf_counter() - start, 'fixed'):
+            await idle_until_change()
     else:
         print("Failed to record audio")
-        time.sleep(15)
-
-def run_recognition_loop():
-    while True:
-        try:
-            asyncio.run(update_song_information())
-        except Exception as e:
-            print(f"Recognition error (retrying): {e}")
-            time.sleep(5)
-
-def start_recognition_thread():
-    thread = threading.Thread(target=run_recognition_loop)
-    thread.daemon = True
-    thread.start()
-
-# Pre-compute FFT band indices (same every frame, expensive to recalculate)
-_band_edges = np.logspace(np.log10(200), np.log10(config['audio']['sample_rate'] // 2), NUM_BARS + 1)
-_precomputed_indices = None
-
-def _build_band_indices(n_samples):
-    global _precomputed_indices
-    freqs = np.fft.fftfreq(n_samples, 1 / config['audio']['sample_rate'])
-    _precomputed_indices = []
-    for i in range(NUM_BARS):
-        _precomputed_indices.append(
-            np.where((freqs >= _band_edges[i]) & (freqs < _band_edges[i + 1]))[0]
-        )
+        await recognizer.sleep(15)
+
+async def race_song_information():
+    """Like update_song_information, but racing growing clips (recognition.clip_seconds)."""
+    race = None
+    if capture is not None:
+        print(f"Racing {'/'.join(f'{s:g}' for s in clip_race.clip_seconds)}s clips...")
+        race = await clip_race.run(capture, identify, answer_track, check=recognition_gate.check)
+    if race is None:
+        print("Failed to record audio")
+        await recognizer.sleep(15)
+    elif race.skipped:
+        await skip_recognition(race.skipped)
+    elif finish_recognition(race.answer, race.samples, race.seconds, 'race'):
+        await idle_until_change()
+
+# Skip silent or unchanged clips before they reach Shazam
+recognition_gate = RecognitionGate(
+    audio_settings['sample_rate'],
+    silence_rms=config.get('recognition', {}).get('silence_rms', 150),
+    similarity=config.get('recognition', {}).get('similarity', 0.97),
+    max_backoff=config.get('recognition', {}).get('max_backoff', 60),
+    recheck_interval=config.get('recognition', {}).get('recheck_interval', 180),
+)
 
-def get_frequency_bands():
-    global _precomputed_indices
-    if stream is None:
-        return np.zeros(NUM_BARS)
+# Recognize as soon as a track boundary is likely (recognition.change_*),
+# judged every frame from the bars' band levels and the input level
+track_changes = None
+if config.get('recognition', {}).get('change_detection', True):
+    track_changes = TrackChangeDetector(
+        silence_rms=config.get('recognition', {}).get('silence_rms', 150),
+        novelty=config.get('recognition', {}).get('change_novelty', 0.15),
+        novelty_seconds=config.get('recognition', {}).get('change_novelty_seconds', 1.5),
+        gap_seconds=config.get('recognition', {}).get('change_gap_seconds', 0.8),
+        cooldown=config.get('recognition', {}).get('change_cooldown', 20),
+    )
 
+def on_track_change(reason):
+    """A new track is likely: recognize now instead of at the next scheduled check."""
+    track_change_count.inc(reason=reason)
+    print(f"Track change likely ({reason}, novelty {track_changes.novelty:.2f}); recognizing now")
+    recognition_gate.force()
+    recognizer.trigger()
+
+# recognition.clip_seconds, e.g. [3, 5, 8]: race growing clips instead of
+# waiting for one record_seconds window (empty: the fixed window)
+clip_race = None
+_clip_seconds = [s for s in config.get('recognition', {}).get('clip_seconds', [])
+                 if 0 < s <= config['audio']['record_seconds']]
+if _clip_seconds:
+    clip_race = ClipRace(_clip_seconds, agree=config.get('recognition', {}).get('clip_agree', 2))
+
+# Local landmark index of tracks Shazam has already matched — opened in the
+# background by start_services(), before the recognizer starts
+fingerprint_index = None
+
+def open_fingerprint_index():
+    global fingerprint_index
+    if not config.get('recognition', {}).get('fingerprint_db', 'fingerprints.db'):
+        return
     try:
-        data = np.frombuffer(stream.read(config['audio']['chunk_size'], exception_on_overflow=False), dtype=np.int16)
-    except Exception:
-        return np.zeros(NUM_BARS)
-
-    if _precomputed_indices is None:
-        _build_band_indices(len(data))
+        fingerprint_index = FingerprintIndex(
+            config.get('recognition', {}).get('fingerprint_db', 'fingerprints.db'),
+            audio_settings['sample_rate'],
+            min_score=config.get('recognition', {}).get('local_min_score', 20),
+        )
+    except Exception as e:
+        print(f"Local fingerprint index unavailable: {e}")
+
+# One long-lived worker: a single event loop with reused Shazam/HTTP clients
+recognizer = RecognitionWorker(update_song_information, timeout=config['network']['timeout'], metrics=metrics)
+
+# Album art by URL hash — downloads happen off the recognition thread
+current_cover_path = None
+cover_cache = CoverArtCache(
+    config['gui'].get('cover_cache_dir', os.path.join('cache', 'covers')),
+    max_bytes=config['gui'].get('cover_cache_mb', 50) * 1024 * 1024,
+    get_session=lambda: recognizer.http,
+    timeout=config['network']['timeout'],
+    latency=recognizer.latency,
+    executor=worker_pool,
+)
+startup.mark('storage + state')
 
-    magnitudes = np.abs(np.fft.rfft(data))
+# Rendered QR codes, cached per setup URL so later boots skip qrcode/PIL
+QR_CACHE_DIR = os.path.join('cache', 'qr')
 
-    bands = np.array([np.sum(magnitudes[idx[idx < len(magnitudes)]]) for idx in _precomputed_indices])
-    return bands
+def start_recognition_thread():
+    recognizer.start()
+
+def start_spectrum_thread(source):
+    """Analyze the visualizer ring every hop, off the render loop."""
+    global spectrum_thread
+    spectrum_thread = threading.Thread(target=spectrum.run, args=(source.visual, spectrum_stop),
+                                       name='spectrum', daemon=True)
+    spectrum_thread.start()
+
+def start_setup():
+    """Always start the setup server (for QR setup anytime) and draw its QR code."""
+    global setup_url, setup_server, setup_qr_surface
+    setup_url, setup_server = start_setup_server(
+        os.path.join(os.getcwd(), 'config.json'), metrics=metrics, executor=worker_pool,
+        history=history,
+    )
+    setup_qr_surface = generate_qr_surface(setup_url, cache_dir=QR_CACHE_DIR)
 
-# Function to draw the equalizer (bars)
-def draw_equalizer(bands, barSurface):
-    global prev_bands
+def connect_lastfm_at_startup():
+    try:
+        with startup.phase('lastfm'):
+            connect_lastfm()
+    finally:
+        startup.release()
 
-    max_height = (HEIGHT // 2) - 40
-    max_width = WIDTH - LEFT_PANEL_W - 20
-    bar_width = max(2, (max_width / NUM_BARS) - BAR_GAP)
+def _start_services():
+    try:
+        with startup.phase('setup server + QR'):
+            start_setup()
+        if capture is None and running:
+            with startup.phase('audio'):
+                open_audio()
+        with startup.phase('fingerprint index'):
+            open_fingerprint_index()
+        if running:
+            with startup.phase('recognizer'):
+                start_recognition_thread()
+    except Exception as e:
+        print(f"Startup failed: {e}")
+    finally:
+        startup.release()
+
+startup_thread = None
+
+def start_services():
+    """Start everything the first frame doesn't need, without waiting for it."""
+    global startup_thread
+    if config['audio'].get('analysis', 'thread') == 'process':
+        open_audio()  # Forks — must happen before any other thread exists
+        startup.mark('audio process')
+
+    startup.hold()
+    worker_pool.submit(connect_lastfm_at_startup)
+
+    startup.hold()
+    startup_thread = threading.Thread(target=_start_services, name='startup', daemon=True)
+    startup_thread.start()
+
+def check_analysis():
+    """If the analysis process has died, carry on with capture and FFT in this process."""
+    global analysis, capture
+    if analysis is None or analysis.alive() or not running:
+        return
+    print("Audio analysis process exited; analysing on the render thread")
+    dead, analysis = analysis, None
+    spectrum.configure(NUM_BARS, fft_size)
+    open_capture()  # Replaces the dead ring, so the recognizer never sees it unset
+    dead.close()  # Also wakes a recognizer still waiting on the old ring
 
-    # Dynamic normalization
-    peak = np.max(bands)
-    if peak > 0:
-        normalized_bands = np.clip(bands / peak, 0, 1)
+def get_frequency_bands():
+    """Newest smoothed (levels, peaks) for the bars, each 0..1 per bar."""
+    if analysis is not None:
+        # Latest snapshot from the analysis process — a copy, never a wait
+        levels, peaks, _rms = analysis.snapshot()
     else:
-        normalized_bands = np.zeros(NUM_BARS)
-
-    for i in range(NUM_BARS):
-        bar_x = i * (bar_width + BAR_GAP)
-        bar_height = max(2, int(normalized_bands[i] * max_height))
+        if capture is not None and spectrum_thread is None:
+            # No analyzer thread (e.g. the benchmark's synthetic source):
+            # catch up on the hops since the last frame here
+            spectrum.update(capture.visual)
+        levels, peaks = spectrum.latest()
+
+    if len(levels) != NUM_BARS:  # Bar count just changed; the analyzer follows next hop
+        return np.zeros(NUM_BARS), np.zeros(NUM_BARS)
+    return levels, peaks
+
+def input_rms():
+    """Input level (int16 RMS) over the last analysis hop."""
+    if analysis is not None:
+        return analysis.snapshot()[2]
+    if capture is None:
+        return 0.0
+    recent = capture.visual.latest(spectrum.hop)
+    return float(np.sqrt(np.mean(np.square(recent, dtype=np.float32)))) if len(recent) else 0.0
 
-        # Brighten taller bars
-        brightness = 0.55 + 0.45 * (bar_height / max_height)
-        r = min(255, int(bar_colors[i][0] * brightness))
-        g = min(255, int(bar_colors[i][1] * brightness))
-        b = min(255, int(bar_colors[i][2] * brightness))
-
-        pygame.draw.rect(barSurface, (r, g, b),
-                         (bar_x, (HEIGHT // 2) - bar_height, bar_width, bar_height))
-
-def scrollArtist():
-    global artist_start_index
-
-    while True:
-        if (len(last_artist_name) - artist_start_index < chunk_size):
-            time.sleep(3)
-            artist_start_index = 0
-            time.sleep(3)
-        else:
-            artist_start_index += 1
-            time.sleep(.2)
-
-def startArtistThread():
-    thread = threading.Thread(target=scrollArtist)
-    thread.daemon = True
-    thread.start()
-
-def scrollSong():
-    global track_start_index
-
-    while True:
-        if (len(last_track_title) - track_start_index < chunk_size):
-            time.sleep(3)
-            track_start_index = 0
-            time.sleep(3)
-        else:
-            track_start_index += 1
-            time.sleep(.2)
-
-def startSongThread():
-    thread = threading.Thread(target=scrollSong)
-    thread.daemon = True
-    thread.start()
+# Function to draw the equalizer (bars)
+def draw_equalizer(bands):
+    """Render the bars, peak caps and reflection; returns the panel surface."""
+    # Already smoothed and gain-normalized by the analyzer
+    levels, peaks = bands
+    return bar_renderer.draw(levels, peaks)
 
 def load_cached_image(path, size, cache_attr):
     """Load and cache an image — only reloads from disk when the file changes."""
@@ -380,14 +749,11 @@ def load_cached_image(path, size, cache_attr):
     if cache_attr == 'album':
         if cached_album_art is not None and cached_album_art_path == path:
             return cached_album_art
-        try:
-            img = pygame.image.load(path).convert()
-            img = pygame.transform.scale(img, size)
+        img = cover_cache.surface(path, size)
+        if img is not None:
             cached_album_art = img
             cached_album_art_path = path
-            return img
-        except (pygame.error, FileNotFoundError):
-            return None
+        return img
     elif cache_attr == 'lastfm':
         if cached_lastfm_img is not None:
             return cached_lastfm_img
@@ -477,117 +843,309 @@ def create_qr_vinyl(qr_surface, size=300):
 
     return surface
 
-def startApp():
-    global running, artist_start_index, track_start_index, vinyl_angle, cached_vinyl, cached_rotated_vinyl, vinyl_frame_counter, reflection_surface
-    global setup_server, setup_qr_surface, lastfm_enabled, network
-    clock = pygame.time.Clock()
-
-    start_recognition_thread()
-    startSongThread()
-    startArtistThread()
+def draw_left_panel(target, art_img):
+    """Draw the parts of the left panel that only change with the track."""
+    # --- Left Panel: Album Art ---
+    if art_img:
+        pygame.draw.rect(target, BORDER_COLOR,
+                         (ART_X - 3, ART_Y - 3, ART_SIZE + 6, ART_SIZE + 6),
+                         border_radius=4)
+        target.blit(art_img, (ART_X, ART_Y))
+    else:
+        pygame.draw.rect(target, (25, 25, 40),
+                         (ART_X, ART_Y, ART_SIZE, ART_SIZE),
+                         border_radius=4)
+        ph = font_small.render("Listening...", True, (80, 80, 110))
+        ph_rect = ph.get_rect(center=(ART_X + ART_SIZE // 2, ART_Y + ART_SIZE // 2))
+        target.blit(ph, ph_rect)
+
+    # --- Left Panel: Last.fm Info ---
+    if lastfm_enabled:
+        lfm_img = load_cached_image("lastfm.jpg", (28, 28), 'lastfm')
+        if lfm_img:
+            target.blit(lfm_img, (12, 12))
+        target.blit(font_small.render(config["lastfm"]["username"], True, TEXT_DIM), (45, 15))
+
+        if last_track_play_count is not None:
+            plays = font_small.render(str(last_track_play_count) + ' plays', True, TEXT_DIM)
+            plays_rect = plays.get_rect(centerx=LEFT_PANEL_W // 2, y=INFO_Y + 68)
+            target.blit(plays, plays_rect)
 
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_ESCAPE:
-                    running = False
+    # --- Divider ---
+    pygame.draw.line(target, (40, 20, 70),
+                     (LEFT_PANEL_W, 0), (LEFT_PANEL_W, HEIGHT), 1)
 
+def blit_strip(target, strip, offset, y):
+    """Show a text strip centered, or through the scroll window if it's too wide."""
+    if strip.get_width() <= TEXT_VIEW_W:
+        target.blit(strip, strip.get_rect(centerx=LEFT_PANEL_W // 2, y=y))
+    else:
+        target.blit(strip, (TEXT_MARGIN, y), (offset, 0, TEXT_VIEW_W, strip.get_height()))
+
+def draw_song_info(target, song_info):
+    """Draw the scrolling title and artist lines."""
+    title_strip, title_offset, artist_strip, artist_offset = song_info
+    if title_strip:
+        blit_strip(target, title_strip, title_offset, INFO_Y)
+
+    if artist_strip:
+        blit_strip(target, artist_strip, artist_offset, INFO_Y + 35)
+
+def scroll_song_info(dt):
+    """Advance both scrollers by the last frame time; returns what to draw."""
+    global scrolled_strips
+    title_strip = text_strips.get(font_title, last_track_title, TEXT_COLOR) if last_track_title else None
+    artist_strip = text_strips.get(font_artist, last_artist_name, TEXT_DIM) if last_artist_name else None
+
+    # New track — start both lines from the beginning
+    if (title_strip, artist_strip) != scrolled_strips:
+        title_scroller.reset()
+        artist_scroller.reset()
+        scrolled_strips = (title_strip, artist_strip)
+
+    title_offset = title_scroller.advance(dt, title_strip.get_width()) if title_strip else 0
+    artist_offset = artist_scroller.advance(dt, artist_strip.get_width()) if artist_strip else 0
+    return title_strip, title_offset, artist_strip, artist_offset
+
+def draw_visualizer(bands):
+    """Draw the visualizer, reflection and QR code onto the screen."""
+    # --- Right Panel: Visualizer + reflection ---
+    screen.blit(draw_equalizer(bands), (LEFT_PANEL_W, 0))
+
+    # --- QR code (top-right, blended) ---
+    if setup_qr_surface:
+        qr_x = WIDTH - setup_qr_surface.get_width() - 10
+        qr_y = 10
+        screen.blit(setup_qr_surface, (qr_x, qr_y))
+
+def draw_vinyl(art_img):
+    """Advance and draw the spinning record (or the QR record when tapped)."""
+    global vinyl_angle, cached_vinyl, qr_vinyl_built
+
+    # --- Spinning Vinyl Record (bottom-right) ---
+    vinyl_angle = (vinyl_angle + VINYL_SPEED) % 360
+
+    if cached_vinyl is None:
+        cached_vinyl = create_vinyl(VINYL_SIZE, art_img)
+        vinyl_sprites.build(cached_vinyl, sprite_pool)
+
+    if show_qr and setup_qr_surface:
+        # Tapping the record swaps in a big QR vinyl for phone setup
+        if not qr_vinyl_built:
+            qr_vinyl_sprites.build(create_qr_vinyl(setup_qr_surface, QR_VINYL_SIZE), sprite_pool)
+            qr_vinyl_built = True
+        sprite, center = qr_vinyl_sprites.frame(vinyl_angle), QR_VINYL_CENTER
+    else:
+        sprite, center = vinyl_sprites.frame(vinyl_angle), VINYL_CENTER
+
+    screen.blit(sprite, (center[0] - sprite.get_width() // 2, center[1] - sprite.get_height() // 2))
+
+# Dirty-rectangle rendering: the static left panel is composed once per
+# track, and only the text strip and right panel are pushed each frame
+dirty_rects = config['gui'].get('dirty_rects', True)
+left_panel_surface = None
+left_panel_key = None
+drawn_song_info = None
+RIGHT_PANEL_RECT = pygame.Rect(LEFT_PANEL_W, 0, WIDTH - LEFT_PANEL_W, HEIGHT)
+SONG_INFO_RECT = pygame.Rect(0, INFO_Y, LEFT_PANEL_W, 66)
+
+# Optional per-stage frame timer — anything with a timed(name) context
+# manager; set by benchmarks/render_pipeline.py, None in normal runs
+frame_stages = None
+_NO_STAGE = contextlib.nullcontext()
+
+def stage(name):
+    return _NO_STAGE if frame_stages is None else frame_stages.timed(name)
+
+def render_full(bands, art_img, song_info):
+    """Redraw everything and flip the whole screen."""
+    with stage('left_panel'):
         screen.fill(BG_COLOR)
+        draw_left_panel(screen, art_img)
+        draw_song_info(screen, song_info)
+    with stage('equalizer'):
+        draw_visualizer(bands)
+    with stage('vinyl'):
+        draw_vinyl(art_img)
+    with stage('flip'):
+        pygame.display.flip()
 
-        # --- Check if credentials were just submitted via QR setup ---
-        if credentials_updated.is_set():
-            credentials_updated.clear()
-            if connect_lastfm():
-                invalidate_album_cache()
-
-        # --- Get audio data ---
+def render_dirty(bands, art_img, song_info, force=False):
+    """Redraw only what changed and push just those rects."""
+    global left_panel_surface, left_panel_key, drawn_song_info
+    dirty = []
+
+    with stage('left_panel'):
+        key = (current_cover_path if art_img else None, lastfm_enabled, config["lastfm"]["username"], last_track_play_count)
+        if left_panel_surface is None or key != left_panel_key:
+            left_panel_surface = pygame.Surface((LEFT_PANEL_W + 1, HEIGHT)).convert()
+            left_panel_surface.fill(BG_COLOR)
+            draw_left_panel(left_panel_surface, art_img)
+            left_panel_key = key
+            force = True
+
+        if force:
+            screen.blit(left_panel_surface, (0, 0))
+            dirty.append(left_panel_surface.get_rect())
+            drawn_song_info = None
+
+        if song_info != drawn_song_info:
+            screen.blit(left_panel_surface, SONG_INFO_RECT, SONG_INFO_RECT)
+            draw_song_info(screen, song_info)
+            drawn_song_info = song_info
+            dirty.append(SONG_INFO_RECT)
+
+    with stage('equalizer'):
+        draw_visualizer(bands)  # The opaque panel surface covers the whole rect
+        dirty.append(RIGHT_PANEL_RECT)
+    with stage('vinyl'):
+        draw_vinyl(art_img)
+
+    with stage('flip'):
+        pygame.display.update(dirty)
+
+def render_frame(dt, force=False):
+    """One pass of the render pipeline: bands, text scroll, then draw."""
+    with stage('fft_bands'):
+        start = time.perf_counter()
         bands = get_frequency_bands()
+        bands_seconds.observe(time.perf_counter() - start)
+        if track_changes is not None:
+            reason = track_changes.observe(bands[0], input_rms(), time.monotonic())
+            if reason:
+                on_track_change(reason)
+
+    with stage('left_panel'):
+        art_img = load_cached_image(current_cover_path, (ART_SIZE, ART_SIZE), 'album')
+        song_info = scroll_song_info(dt)
+
+    if dirty_rects:
+        render_dirty(bands, art_img, song_info, force=force)
+    else:
+        render_full(bands, art_img, song_info)
+
+# Render-thread CPU per frame, reported every few seconds for comparing modes
+render_cpu = {'frames': 0, 'cpu': 0.0, 'since': time.monotonic()}
+
+def record_render_cpu(cpu_seconds):
+    render_cpu['frames'] += 1
+    render_cpu['cpu'] += cpu_seconds
+
+def report_render_cpu():
+    elapsed = time.monotonic() - render_cpu['since']
+    if render_cpu['frames']:
+        mode = "dirty-rect" if dirty_rects else "full-frame"
+        per_frame = render_cpu['cpu'] / render_cpu['frames'] * 1000
+        print(f"Render ({mode}): {per_frame:.1f}ms CPU/frame, "
+              f"{render_cpu['frames'] / elapsed:.0f} FPS, {render_cpu['cpu'] / elapsed * 100:.0f}% of a core")
+    render_cpu.update(frames=0, cpu=0.0, since=time.monotonic())
+
+def toggle_qr_vinyl(pos):
+    """Show or hide the QR vinyl when the record is tapped."""
+    global show_qr
+    center, size = (QR_VINYL_CENTER, QR_VINYL_SIZE) if show_qr else (VINYL_CENTER, VINYL_SIZE)
+    if (pos[0] - center[0]) ** 2 + (pos[1] - center[1]) ** 2 <= (size // 2) ** 2:
+        show_qr = not show_qr
+
+def apply_quality(tier):
+    """Switch the visualizer to another quality tier (on the render thread)."""
+    global quality, TARGET_FPS, VINYL_SPEED, NUM_BARS, fft_size, bar_renderer, vinyl_sprites, cached_vinyl
+    quality = tier
+    TARGET_FPS = tier.fps
+    VINYL_SPEED = 270.0 / TARGET_FPS  # 45 RPM at any frame rate
+    fft_size = visual_fft_size(tier)
+
+    if tier.bars != NUM_BARS or tier.reflection != bar_renderer.reflection:
+        NUM_BARS = tier.bars
+        bar_renderer = make_bar_renderer()
+
+    if analysis is not None:
+        analysis.configure(NUM_BARS, fft_size)
+    else:
+        spectrum.configure(NUM_BARS, fft_size)
 
-        # --- Left Panel: Album Art ---
-        art_img = load_cached_image("image.jpg", (ART_SIZE, ART_SIZE), 'album')
-        if art_img:
-            pygame.draw.rect(screen, BORDER_COLOR,
-                             (ART_X - 3, ART_Y - 3, ART_SIZE + 6, ART_SIZE + 6),
-                             border_radius=4)
-            screen.blit(art_img, (ART_X, ART_Y))
-        else:
-            pygame.draw.rect(screen, (25, 25, 40),
-                             (ART_X, ART_Y, ART_SIZE, ART_SIZE),
-                             border_radius=4)
-            ph = font_small.render("Listening...", True, (80, 80, 110))
-            ph_rect = ph.get_rect(center=(ART_X + ART_SIZE // 2, ART_Y + ART_SIZE // 2))
-            screen.blit(ph, ph_rect)
-
-        # --- Left Panel: Song Info ---
-        info_y = ART_Y + ART_SIZE + 20
-
-        title_text = last_track_title[track_start_index:track_start_index + chunk_size]
-        if title_text:
-            surf = font_title.render(title_text, True, TEXT_COLOR)
-            rect = surf.get_rect(centerx=LEFT_PANEL_W // 2, y=info_y)
-            screen.blit(surf, rect)
-
-        artist_text = last_artist_name[artist_start_index:artist_start_index + chunk_size]
-        if artist_text:
-            surf = font_artist.render(artist_text, True, TEXT_DIM)
-            rect = surf.get_rect(centerx=LEFT_PANEL_W // 2, y=info_y + 35)
-            screen.blit(surf, rect)
-
-        # --- Left Panel: Last.fm Info ---
-        if lastfm_enabled:
-            lfm_img = load_cached_image("lastfm.jpg", (28, 28), 'lastfm')
-            if lfm_img:
-                screen.blit(lfm_img, (12, 12))
-            screen.blit(font_small.render(config["lastfm"]["username"], True, TEXT_DIM), (45, 15))
-
-            plays = font_small.render(str(last_track_play_count) + ' plays', True, TEXT_DIM)
-            plays_rect = plays.get_rect(centerx=LEFT_PANEL_W // 2, y=info_y + 68)
-            screen.blit(plays, plays_rect)
-
-        # --- Divider ---
-        pygame.draw.line(screen, (40, 20, 70),
-                         (LEFT_PANEL_W, 0), (LEFT_PANEL_W, HEIGHT), 1)
-
-        # --- Right Panel: Visualizer ---
-        bar_surface.fill(BG_COLOR)
-        draw_equalizer(bands, bar_surface)
-        screen.blit(bar_surface, (LEFT_PANEL_W, 0))
-
-        # Reflection
-        reflection_surface = pygame.transform.flip(bar_surface, False, True)
-        reflection_surface.set_alpha(50)
-        screen.blit(reflection_surface, (LEFT_PANEL_W, HEIGHT // 2))
-
-        # --- QR code (top-right, blended) ---
-        if setup_qr_surface:
-            qr_x = WIDTH - setup_qr_surface.get_width() - 10
-            qr_y = 10
-            screen.blit(setup_qr_surface, (qr_x, qr_y))
-
-        # --- Spinning Vinyl Record (bottom-right) ---
-        vinyl_angle = (vinyl_angle + VINYL_SPEED) % 360
-        vinyl_frame_counter += 1
-
-        if cached_vinyl is None:
-            cached_vinyl = create_vinyl(VINYL_SIZE, art_img)
+    if tier.vinyl_frames != vinyl_sprites.count:
+        vinyl_sprites = RotationSprites(frames=tier.vinyl_frames)
+        cached_vinyl = None  # Rebuilt and re-rotated on the next frame
 
-        if cached_rotated_vinyl is None or vinyl_frame_counter % 3 == 0:
-            cached_rotated_vinyl = pygame.transform.rotate(cached_vinyl, vinyl_angle)
+def govern_quality():
+    tier = quality_governor.evaluate()
+    if tier is not None:
+        apply_quality(tier)
 
-        rot_rect = cached_rotated_vinyl.get_rect(
-            center=(WIDTH - VINYL_SIZE // 2 - 20, HEIGHT - VINYL_SIZE // 2 - 10))
-        screen.blit(cached_rotated_vinyl, rot_rect)
+def startApp():
+    global running, dirty_rects
+    clock = pygame.time.Clock()
 
-        # --- Flip ---
-        pygame.display.flip()
-        clock.tick(TARGET_FPS)
+    start_services()
+    scheduler.call_every(0.5, check_credentials)
+    scheduler.call_every(1.0, flush_scrobbles)
+    scheduler.call_every(10.0, report_render_cpu)
+    if analysis is not None:
+        scheduler.call_every(1.0, check_analysis)
+    if quality_governor is not None:
+        scheduler.call_every(2.0, govern_quality)
+
+    force_redraw = True
+    dt = 0.0
+    try:
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    toggle_qr_vinyl(event.pos)
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        running = False
+                    elif event.key == pygame.K_d:
+                        # Toggle rendering mode to compare CPU cost
+                        dirty_rects = not dirty_rects
+                        force_redraw = True
+                        render_cpu.update(frames=0, cpu=0.0, since=time.monotonic())
+
+            frame_start = time.thread_time()
+            frame_wall = time.perf_counter()
+            render_frame(dt, force=force_redraw)
+            force_redraw = False
+            startup.frame_shown()
+
+            frame_work = time.perf_counter() - frame_wall
+            frame_seconds.observe(frame_work)
+            if quality_governor is not None:
+                quality_governor.observe(frame_work)
+            record_render_cpu(time.thread_time() - frame_start)
+            frame_ms = clock.tick(TARGET_FPS)
+            frame_interval_seconds.observe(frame_ms / 1000.0)
+            dt = frame_ms / 1000.0
+            scheduler.advance(frame_ms)
+    finally:
+        stopApp()
 
 def stopApp():
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    """Shut everything down in order: producers first, then storage."""
+    global running
+    running = False
+    if startup_thread is not None:
+        startup_thread.join(5)  # Don't open things while we close them
+    scheduler.clear()
+    spectrum_stop.set()
+    if analysis is not None:
+        analysis.close()  # Stops the child and wakes a waiting recognizer
+    elif capture is not None:
+        capture.close()  # Also wakes a recognizer waiting for audio
+    if spectrum_thread is not None:
+        spectrum_thread.join(1)
+    recognizer.stop()
+    worker_pool.shutdown(wait=True)
+    sprite_pool.shutdown(wait=True)
+    if setup_server is not None:
+        setup_server.shutdown()
+        setup_server.server_close()
+    scrobble_queue.close()
+    history.close()
+    if fingerprint_index is not None:
+        fingerprint_index.close()
     pygame.quit()
 
 if __name__ == "__main__":
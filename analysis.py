@@ -0,0 +1,189 @@
+"""
+ScrobbleDaddy - Out-of-Process Audio Analysis
+
+Runs mic capture and the visualizer FFT in a child process, so band
+aggregation no longer competes for the GIL with the render, recognition
+and HTTP threads. Everything is exchanged through one shared-memory block:
+
+1. The child's capture ring lives in shared memory, so the recognizer in
+   the parent still reads clips straight out of it (zero-copy)
+2. The child runs the SpectrumAnalyzer, and after every hop publishes the
+   smoothed levels, peaks and RMS under a seqlock; the render loop copies
+   that snapshot and never waits
+3. The parent asks for a different bar count or FFT size (quality tiers)
+   through two control words the child checks every hop
+
+The seqlock is best-effort on weakly ordered CPUs: a torn read can at
+worst show one frame of mixed bars, never block or crash.
+"""
+
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from audio_capture import AudioCapture
+
+MAX_BARS = 256
+
+# Control words (int64) at the start of the block
+SEQ, BARS, WANT_BARS, WANT_FFT, WRITE_POS, SAMPLES_WRITTEN = range(6)
+_CTRL_BYTES = 8 * 8
+_PAYLOAD_BYTES = 8 * (2 * MAX_BARS + 1)  # float64 levels, peaks, then RMS
+PEAKS, RMS = MAX_BARS, 2 * MAX_BARS
+
+
+def _views(buf, capacity):
+    ctrl = np.ndarray(8, dtype=np.int64, buffer=buf)
+    payload = np.ndarray(2 * MAX_BARS + 1, dtype=np.float64, buffer=buf, offset=_CTRL_BYTES)
+    ring = np.ndarray(capacity * 2, dtype=np.int16, buffer=buf, offset=_CTRL_BYTES + _PAYLOAD_BYTES)
+    return ctrl, payload, ring
+
+
+class _SharedRing(AudioCapture):
+    """Parent-side view of the child's capture ring (read-only use)."""
+
+    def start(self):
+        return self
+
+    def wait_for(self, n, timeout=None):
+        # The writer is in another process, so poll instead of a Condition
+        target = self.samples_written + n
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.samples_written < target and not self._closed:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(0.05)
+        return self.samples_written >= target and not self._closed
+
+
+def _analysis_main(ctrl, payload, ring, sample_rate, chunk_size, seconds, channels,
+                   device, decimate, spectrum_options, stop):
+    # Runs in the forked child; the shared block is already mapped here
+    from spectrum import SpectrumAnalyzer
+
+    capture = None
+    try:
+        capture = AudioCapture(sample_rate, chunk_size, seconds, channels=channels,
+                               device=device, buffer=ring, decimate=decimate,
+                               state=ctrl[WRITE_POS:SAMPLES_WRITTEN + 1]).start()
+        visual = capture.visual
+        analyzer = SpectrumAnalyzer(min(int(ctrl[WANT_FFT]), visual.capacity), visual.sample_rate,
+                                    int(ctrl[WANT_BARS]), **spectrum_options)
+        while not stop.is_set():
+            if not visual.wait_for(analyzer.hop, timeout=0.25):
+                continue
+
+            analyzer.configure(int(ctrl[WANT_BARS]), min(int(ctrl[WANT_FFT]), visual.capacity))
+            if not analyzer.update(visual):
+                continue
+            levels, peaks = analyzer.latest()
+            num_bars = len(levels)
+            data = visual.latest(analyzer.hop)
+            rms = float(np.sqrt(np.mean(np.square(data, dtype=np.float32))))
+
+            ctrl[SEQ] += 1  # Odd: write in progress
+            payload[:num_bars] = levels
+            payload[PEAKS:PEAKS + num_bars] = peaks
+            payload[RMS] = rms
+            ctrl[BARS] = num_bars
+            ctrl[SEQ] += 1  # Even: snapshot complete
+    except Exception as e:
+        print(f"Audio analysis process failed: {e}")
+    finally:
+        if capture is not None:
+            capture.close()
+
+
+class AnalysisProcess:
+    """Capture + FFT in a child process; bands, RMS and audio in shared memory.
+
+    `spectrum_options` are passed to the child's SpectrumAnalyzer (hop,
+    attack, release, ...).
+    """
+
+    def __init__(self, sample_rate, chunk_size, seconds, channels=1, device=None, decimate=1,
+                 num_bars=48, fft_size=8192, spectrum_options=None):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.seconds = seconds
+        self.channels = channels
+        self.device = device
+        self.decimate = decimate
+        self.spectrum_options = spectrum_options or {'hop': max(1, sample_rate // decimate // 100)}
+        self.capacity = AudioCapture.capacity_for(sample_rate, seconds)
+
+        self._shm = shared_memory.SharedMemory(
+            create=True, size=_CTRL_BYTES + _PAYLOAD_BYTES + self.capacity * 4)
+        self._ctrl, self._payload, self._ring = _views(self._shm.buf, self.capacity)
+        self._ctrl[:] = 0
+        self.configure(num_bars, fft_size)
+
+        # The recognizer reads clips from here, exactly as from AudioCapture
+        self.audio = _SharedRing(sample_rate, chunk_size, seconds, channels=channels,
+                                 buffer=self._ring, state=self._ctrl[WRITE_POS:SAMPLES_WRITTEN + 1])
+
+        self._snapshot = np.zeros((2, MAX_BARS), dtype=np.float64)  # Levels, peaks
+        self._scratch = np.zeros((2, MAX_BARS), dtype=np.float64)
+        self._rms = 0.0
+        self._num_bars = 0
+        self._stop = None
+        self._process = None
+
+    def configure(self, num_bars, fft_size):
+        """Ask the child for a different bar count / FFT window (next hop)."""
+        self._ctrl[WANT_BARS] = min(num_bars, MAX_BARS)
+        self._ctrl[WANT_FFT] = fft_size
+
+    def start(self):
+        # fork, not spawn: a spawned child would re-run ScrobbleDaddy.py's
+        # module-level setup. Start this before any other thread exists.
+        context = multiprocessing.get_context('fork')
+        self._stop = context.Event()
+        self._process = context.Process(
+            target=_analysis_main,
+            args=(self._ctrl, self._payload, self._ring, self.sample_rate, self.chunk_size,
+                  self.seconds, self.channels, self.device, self.decimate, self.spectrum_options,
+                  self._stop),
+            name='audio-analysis', daemon=True)
+        self._process.start()
+        return self
+
+    def alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def snapshot(self):
+        """Newest (levels, peaks, rms) without waiting; the last good one on contention."""
+        ctrl = self._ctrl
+        for _ in range(4):
+            seq = int(ctrl[SEQ])
+            if seq & 1:
+                continue
+            num_bars = int(ctrl[BARS])
+            self._scratch[0, :num_bars] = self._payload[:num_bars]
+            self._scratch[1, :num_bars] = self._payload[PEAKS:PEAKS + num_bars]
+            rms = float(self._payload[RMS])
+            if int(ctrl[SEQ]) == seq:
+                self._snapshot, self._scratch = self._scratch, self._snapshot
+                self._num_bars = num_bars
+                self._rms = rms
+                break
+        return self._snapshot[0, :self._num_bars], self._snapshot[1, :self._num_bars], self._rms
+
+    def close(self):
+        """Stop the child, wake recognizer waits and release shared memory."""
+        self.audio.close()
+        if self._process is not None:
+            self._stop.set()
+            self._process.join(2)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(1)
+            self._process = None
+        # Unlink now; the mapping itself goes when the last view (e.g. a clip
+        # the recognizer still holds) is gone, or at exit
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,302 @@
+"""
+ScrobbleDaddy - Shared Audio Capture
+
+Opens the microphone exactly once, in PyAudio callback mode, and keeps the
+most recent audio in a preallocated NumPy ring buffer:
+
+1. The visualizer's analyzer reads an FFT window ending at each hop (by
+   sample position, so it can catch up after a stall), from a second ring
+   fed through an anti-aliased decimator when the profile asks for one —
+   the bars don't need the full bandwidth
+2. The recognizer takes the last `record_seconds` at the full rate, as a
+   zero-copy view
+
+`audio_profile()` picks the capture settings for this platform from the
+`audio` config section.
+
+The ring is "mirrored": every sample is written twice, `capacity` apart, so
+any window up to `capacity` samples long is one contiguous slice of memory.
+The ring and its positions can live in caller-provided arrays (e.g. shared
+memory, see analysis.py) instead of private ones.
+"""
+
+import io
+import threading
+import wave
+
+import numpy as np
+
+from spectrum import Decimator
+
+# Shazam wants at least this; lower rates in a profile are ignored
+MIN_SAMPLE_RATE = 16000
+
+# Length of the decimated visualizer ring
+VISUAL_SECONDS = 1
+
+
+def audio_profile(audio, is_pi):
+    """Capture settings for this platform from the `audio` config section.
+
+    On the Pi, `<key>_pi` entries (sample_rate_pi, chunk_size_pi,
+    device_pi, visualizer_rate_pi) override the plain ones. `device` may be
+    an index or part of a device name; `device_index` is still honored when
+    `device` is unset. `visualizer_rate` defaults to the sample rate (no
+    decimation).
+    """
+    def pick(key, default=None):
+        value = audio.get(key, default)
+        if is_pi and audio.get(f"{key}_pi") not in (None, ''):
+            value = audio[f"{key}_pi"]
+        return value
+
+    sample_rate = audio['sample_rate']
+    if is_pi and audio.get('sample_rate_pi'):
+        if audio['sample_rate_pi'] >= MIN_SAMPLE_RATE:
+            sample_rate = audio['sample_rate_pi']
+        else:
+            print(f"Ignoring sample_rate_pi={audio['sample_rate_pi']} "
+                  f"(below {MIN_SAMPLE_RATE} Hz); using {sample_rate}")
+
+    device = pick('device')
+    if device in (None, ''):
+        device = pick('device_index')
+
+    visualizer_rate = pick('visualizer_rate') or sample_rate
+    return {
+        'sample_rate': sample_rate,
+        'chunk_size': pick('chunk_size', 1024),
+        'channels': audio.get('channels', 1),
+        'device': device,
+        'decimate': max(1, round(sample_rate / visualizer_rate)),
+    }
+
+
+def encode_wav(samples, samplerate):
+    """Encode mono int16 samples as an in-memory WAV file."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(samplerate)
+        wav.writeframes(np.ascontiguousarray(samples, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+
+class AudioCapture:
+    """Single callback-driven input stream feeding a mirrored ring buffer."""
+
+    def __init__(self, sample_rate, chunk_size, seconds, channels=1, device=None,
+                 buffer=None, state=None, decimate=1):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.channels = channels
+        self.device = device
+
+        # Twice the longest window we hand out, so a view stays valid for a
+        # full window's worth of new audio before the writer reaches it.
+        self.capacity = self.capacity_for(sample_rate, seconds)
+        self._buffer = np.zeros(self.capacity * 2, dtype=np.int16) if buffer is None else buffer
+        # [write position, total samples written]
+        self._state = np.zeros(2, dtype=np.int64) if state is None else state
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # What the visualizer reads: this ring, or a decimated copy of it
+        self._decimator = None
+        self.visual = self
+        if decimate > 1:
+            self._decimator = Decimator(decimate)
+            self.visual = AudioCapture(sample_rate // decimate, chunk_size, VISUAL_SECONDS)
+
+        self._pa = None
+        self._stream = None
+
+    @staticmethod
+    def capacity_for(sample_rate, seconds):
+        return int(sample_rate * seconds) * 2
+
+    @property
+    def samples_written(self):
+        return int(self._state[1])
+
+    @property
+    def closed(self):
+        return self._closed
+
+    # --- Stream lifecycle ---
+
+    def start(self):
+        """Open the input device and start the callback stream."""
+        import pyaudio
+
+        self._pa = pyaudio.PyAudio()
+        self._stream = self._pa.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            input=True,
+            input_device_index=self._find_device(),
+            frames_per_buffer=self.chunk_size,
+            stream_callback=self._callback,
+        )
+        self._stream.start_stream()
+        return self
+
+    def _find_device(self):
+        """Input device index for `self.device` (an index or part of a name), or None."""
+        device = self.device
+        if device in (None, ''):
+            return None
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)
+        for i in range(self._pa.get_device_count()):
+            info = self._pa.get_device_info_by_index(i)
+            if info.get('maxInputChannels', 0) < 1:
+                continue
+            if i == device or (isinstance(device, str) and device.lower() in info['name'].lower()):
+                print(f"Audio input: {info['name']} (device {i})")
+                return i
+        print(f"Audio input {self.device!r} not found; using the default device")
+        return None
+
+    def close(self):
+        """Stop the stream, release the audio device and wake any waiters."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                print(f"Error closing audio stream: {e}")
+            self._stream = None
+        if self._pa is not None:
+            self._pa.terminate()
+            self._pa = None
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        import pyaudio
+
+        samples = np.frombuffer(in_data, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples[::self.channels]
+        self.write(samples)
+        return None, pyaudio.paContinue
+
+    # --- Ring buffer ---
+
+    def write(self, samples):
+        """Append samples to the ring (called from the audio thread)."""
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        pos = int(self._state[0])
+        first = min(n, cap - pos)
+        self._buffer[pos:pos + first] = samples[:first]
+        self._buffer[pos + cap:pos + cap + first] = samples[:first]
+        if first < n:
+            rest = n - first
+            self._buffer[:rest] = samples[first:]
+            self._buffer[cap:cap + rest] = samples[first:]
+
+        with self._cond:
+            self._state[0] = (pos + n) % cap
+            self._state[1] += n
+            self._cond.notify_all()
+
+        if self._decimator is not None:
+            self.visual.write(self._decimator(samples))
+
+    def latest(self, n):
+        """Return a read-only view of the newest `n` samples (no copy)."""
+        n = min(n, self.capacity, self.samples_written)
+        end = int(self._state[0]) + self.capacity
+        view = self._buffer[end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def window_at(self, end, n):
+        """Read-only view of the `n` samples ending at sample `end` (counted
+        from the start), or None if they aren't all in the ring."""
+        with self._cond:
+            pos, written = int(self._state[0]), int(self._state[1])
+        if n > end or end > written or written - end + n > self.capacity:
+            return None
+        stop = (pos - (written - end)) % self.capacity + self.capacity
+        view = self._buffer[stop - n:stop]
+        view.flags.writeable = False
+        return view
+
+    def wait_for(self, n, timeout=None):
+        """Block until `n` new samples have arrived; False on timeout or close."""
+        with self._cond:
+            target = self.samples_written + n
+            self._cond.wait_for(lambda: self.samples_written >= target or self._closed, timeout)
+            return self.samples_written >= target and not self._closed
+
+    def record(self, seconds):
+        """Wait for `seconds` of fresh audio and return it as a view."""
+        n = int(self.sample_rate * seconds)
+        if not self.wait_for(n, timeout=seconds * 2 + 1):
+            return None
+        return self.latest(n)
+
+
+class SyntheticAudio(AudioCapture):
+    """Generated test signal in place of the microphone (for benchmarks).
+
+    Has the same ring-buffer interface as AudioCapture, but nothing is
+    opened: call `feed(n)` to append the next `n` samples of the signal.
+    """
+
+    SIGNALS = ('sweep', 'pink', 'silence')
+
+    def __init__(self, sample_rate, chunk_size, seconds, signal='sweep',
+                 level=8000, sweep_seconds=10.0, seed=0, decimate=1):
+        super().__init__(sample_rate, chunk_size, seconds, decimate=decimate)
+        if signal not in self.SIGNALS:
+            raise ValueError(f"Unknown signal {signal!r}; expected one of {', '.join(self.SIGNALS)}")
+        self.signal = signal
+        self.level = level
+        self.sweep_seconds = sweep_seconds
+        self._t = 0
+        self._loop = None
+
+        if signal == 'pink':
+            # 1/f-shaped noise, generated once and looped
+            n = int(sample_rate * sweep_seconds)
+            spectrum = np.fft.rfft(np.random.default_rng(seed).standard_normal(n))
+            spectrum[1:] /= np.sqrt(np.arange(1, len(spectrum)))
+            spectrum[0] = 0
+            noise = np.fft.irfft(spectrum, n)
+            self._loop = (noise / np.max(np.abs(noise)) * level).astype(np.int16)
+
+    def start(self):
+        return self
+
+    def _generate(self, n):
+        t = self._t + np.arange(n)
+        if self.signal == 'silence':
+            return np.zeros(n, dtype=np.int16)
+        if self.signal == 'pink':
+            return self._loop[t % len(self._loop)]
+
+        # Exponential sine sweep, 40 Hz up to Nyquist, restarting every sweep_seconds
+        f0, f1 = 40.0, self.sample_rate / 2.0
+        period = self.sweep_seconds
+        k = np.log(f1 / f0) / period
+        seconds = (t / self.sample_rate) % period
+        phase = 2 * np.pi * f0 * (np.exp(k * seconds) - 1) / k
+        return (np.sin(phase) * self.level).astype(np.int16)
+
+    def feed(self, n):
+        """Append the next `n` samples of the signal to the ring."""
+        self.write(self._generate(n))
+        self._t += n
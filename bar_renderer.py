@@ -0,0 +1,118 @@
+"""
+ScrobbleDaddy - Batch Bar Renderer
+
+Draws every equalizer bar and its dimmed reflection straight into a pixel
+array in one NumPy pass, instead of one pygame.draw.rect per bar plus a
+flip + set_alpha of the whole bar surface every frame:
+
+1. Per-bar colour columns are precomputed for every bar height (taller
+   bars are brighter), already mapped to the surface's pixel format
+2. The reflection colours are pre-blended against the background
+3. Each frame builds one column mask and writes bars + reflection with
+   `np.copyto(..., where=mask)` through `pygame.surfarray.pixels2d`
+4. With `reflection=False` the lower half is cleared once and left alone
+5. Peak-hold caps, when given, are a few pixels per column written by
+   fancy indexing in the bar's brightest colour
+"""
+
+import numpy as np
+
+PEAK_CAP = 3  # Peak-hold cap height in pixels
+
+
+class BarRenderer:
+    """Renders NUM_BARS bars and their reflection into one surface."""
+
+    def __init__(self, width, height, bar_colors, bg_color, gap=3, reflection_alpha=50,
+                 reflection=True):
+        import pygame
+
+        self.width = width
+        self.reflection = reflection
+        self.half = height // 2
+        self.num_bars = len(bar_colors)
+        self.max_height = self.half - 40
+        self.surface = pygame.Surface((width, self.half * 2)).convert()
+        self.surface.fill(bg_color)
+
+        # Column → bar index (-1 for the gaps). Bars start at fractional
+        # positions so each keeps at least one column, and the gap narrows
+        # once bars would get thinner than 2 px
+        max_width = width - 20
+        if self.num_bars > width:
+            print(f"{self.num_bars} bars don't fit in {width} px; "
+                  f"the highest {self.num_bars - width} bands won't be drawn")
+        pitch = max(1.0, max_width / self.num_bars)
+        gap = min(gap, max(0, int(pitch) - 2))
+        self.col_bar = np.full(width, -1, dtype=np.intp)
+        for i in range(self.num_bars):
+            x0 = int(i * pitch)
+            self.col_bar[x0:min(width, max(x0 + 1, int((i + 1) * pitch) - gap))] = i
+        self._bar_cols = self.col_bar >= 0
+
+        # Colour for every (bar, height): brightness rises with the bar
+        heights = np.arange(self.max_height + 1, dtype=np.float32)
+        brightness = 0.55 + 0.45 * (heights / self.max_height)
+        base = np.array(bar_colors, dtype=np.float32)
+        lit = np.minimum(255, (base[:, None, :] * brightness[None, :, None]).astype(np.int32))
+        bg = np.array(bg_color, dtype=np.int32)
+        dim = bg + (lit - bg) * reflection_alpha // 255
+
+        self._bar_lut = self._map(lit)
+        self._reflection_lut = self._map(dim)
+        self._bg = self._map(bg[None, None, :])[0, 0]
+        self._peak_lut = self._bar_lut[:, self.max_height]
+
+        self._rows = np.arange(self.half)
+        self._cap_cols = np.flatnonzero(self._bar_cols)[:, None]
+        self._cap_offsets = np.arange(PEAK_CAP)[None, :]
+        self._col_height = np.zeros(width, dtype=np.intp)
+        self._mask = np.empty((width, self.half), dtype=bool)
+
+    def _map(self, rgb):
+        """Map an (..., 3) RGB array to this surface's packed pixel values."""
+        shifts = self.surface.get_shifts()
+        losses = self.surface.get_losses()
+        alpha = self.surface.get_masks()[3]
+        rgb = rgb.astype(np.uint32)
+        return (((rgb[..., 0] >> losses[0]) << shifts[0])
+                | ((rgb[..., 1] >> losses[1]) << shifts[1])
+                | ((rgb[..., 2] >> losses[2]) << shifts[2])
+                | np.uint32(alpha))
+
+    def draw(self, normalized_bands, peaks=None):
+        """Render bars for band levels in 0..1 (and peak caps); returns the surface."""
+        import pygame
+
+        heights = np.maximum(2, (normalized_bands * self.max_height).astype(np.intp))
+        heights = np.minimum(heights, self.max_height)
+        col_height = self._col_height
+        col_height[:] = 0
+        col_height[self._bar_cols] = heights[self.col_bar[self._bar_cols]]
+        bar_index = np.where(self._bar_cols, self.col_bar, 0)
+
+        pixels = pygame.surfarray.pixels2d(self.surface)
+        try:
+            top = pixels[:, :self.half]
+            bottom = pixels[:, self.half:]
+
+            # Bars grow up from the middle line...
+            np.greater_equal(self._rows[None, :], (self.half - col_height)[:, None], out=self._mask)
+            top[...] = self._bg
+            np.copyto(top, self._bar_lut[bar_index, col_height][:, None], where=self._mask)
+
+            # Peak caps sit just above each bar's held peak
+            if peaks is not None:
+                peak_heights = np.clip((peaks * self.max_height).astype(np.intp), 2, self.max_height)
+                bars = self.col_bar[self._cap_cols]
+                cap_rows = (self.half - PEAK_CAP) - peak_heights[bars] + self._cap_offsets
+                top[self._cap_cols, cap_rows] = self._peak_lut[bars]
+
+            # ...and the reflection is the same mask, mirrored
+            if self.reflection:
+                bottom[...] = self._bg
+                np.copyto(bottom, self._reflection_lut[bar_index, col_height][:, None],
+                          where=self._mask[:, ::-1])
+        finally:
+            del pixels
+        return self.surface
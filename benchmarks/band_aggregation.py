@@ -0,0 +1,65 @@
+"""
+ScrobbleDaddy - Band Aggregation Micro-Benchmark
+
+Compares the original per-band list comprehension in get_frequency_bands()
+with the precomputed BandAggregator at several bar counts.
+
+Usage: python benchmarks/band_aggregation.py [--chunk 8192] [--rate 48000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from spectrum import BandAggregator  # noqa: E402
+
+
+def legacy_indices(n_samples, sample_rate, num_bars):
+    """Index arrays exactly as the original _build_band_indices built them."""
+    band_edges = np.logspace(np.log10(200), np.log10(sample_rate // 2), num_bars + 1)
+    freqs = np.fft.fftfreq(n_samples, 1 / sample_rate)
+    return [np.where((freqs >= band_edges[i]) & (freqs < band_edges[i + 1]))[0]
+            for i in range(num_bars)]
+
+
+def legacy_bands(data, indices):
+    magnitudes = np.abs(np.fft.rfft(data))
+    return np.array([np.sum(magnitudes[idx[idx < len(magnitudes)]]) for idx in indices])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--chunk', type=int, default=8192)
+    parser.add_argument('--rate', type=int, default=48000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = (rng.standard_normal(args.chunk) * 3000).astype(np.int16)
+
+    print(f"chunk={args.chunk} rate={args.rate} repeat={args.repeat}")
+    print(f"{'bars':>6} {'legacy':>10} {'f64 rect':>10} {'f32 hann':>10} {'speedup':>8} {'max err':>9}")
+    for num_bars in (48, 96, 192):
+        indices = legacy_indices(args.chunk, args.rate, num_bars)
+        exact = BandAggregator(args.chunk, args.rate, num_bars, window=None, dtype=np.float64)
+        fast = BandAggregator(args.chunk, args.rate, num_bars)
+
+        # Same bands as before when run unwindowed in float64
+        expected = legacy_bands(data, indices)
+        err = np.max(np.abs(exact(data) - expected) / np.maximum(expected, 1))
+
+        t_legacy = min(timeit.repeat(lambda: legacy_bands(data, indices), number=args.repeat, repeat=3))
+        t_exact = min(timeit.repeat(lambda: exact(data), number=args.repeat, repeat=3))
+        t_fast = min(timeit.repeat(lambda: fast(data), number=args.repeat, repeat=3))
+
+        per = 1e6 / args.repeat
+        print(f"{num_bars:>6} {t_legacy * per:>8.0f}us {t_exact * per:>8.0f}us "
+              f"{t_fast * per:>8.0f}us {t_legacy / t_fast:>7.1f}x {err:>9.1e}")
+
+
+if __name__ == '__main__':
+    main()
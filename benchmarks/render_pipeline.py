@@ -0,0 +1,166 @@
+"""
+ScrobbleDaddy - Headless Render Pipeline Benchmark
+
+Runs the startApp() render pipeline without a screen or microphone: SDL's
+dummy video driver stands in for the display and a synthetic signal (sine
+sweep, pink noise or silence) stands in for the mic. Prints per-stage frame
+time percentiles as JSON so runs can be diffed.
+
+Usage: python benchmarks/render_pipeline.py [--signal sweep] [--frames 600] [--mode dirty]
+
+Run it from the repo root — ScrobbleDaddy reads config.json from there.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from audio_capture import SyntheticAudio  # noqa: E402
+
+STAGES = ('capture', 'fft_bands', 'equalizer', 'left_panel', 'vinyl', 'flip')
+
+
+class FrameStages:
+    """Collects per-stage wall time, summed within each frame."""
+
+    def __init__(self):
+        self.samples = {name: [] for name in STAGES + ('total',)}
+        self._frame = {}
+
+    def timed(self, name):
+        return _Stage(self, name)
+
+    def add(self, name, seconds):
+        self._frame[name] = self._frame.get(name, 0.0) + seconds
+
+    def end_frame(self, total_seconds):
+        for name in STAGES:
+            self.samples[name].append(self._frame.get(name, 0.0))
+        self.samples['total'].append(total_seconds)
+        self._frame = {}
+
+    def summary(self):
+        report = {}
+        for name, values in self.samples.items():
+            ms = np.array(values) * 1000
+            report[name] = {
+                'mean_ms': round(float(ms.mean()), 4),
+                'p50_ms': round(float(np.percentile(ms, 50)), 4),
+                'p90_ms': round(float(np.percentile(ms, 90)), 4),
+                'p99_ms': round(float(np.percentile(ms, 99)), 4),
+                'max_ms': round(float(ms.max()), 4),
+            }
+        return report
+
+
+class _Stage:
+    __slots__ = ('stages', 'name', 'start')
+
+    def __init__(self, stages, name):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.stages.add(self.name, time.perf_counter() - self.start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--signal', choices=SyntheticAudio.SIGNALS, default='sweep')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--mode', choices=('dirty', 'full'), default='dirty')
+    parser.add_argument('--tier', help="quality tier to render at (default: the app's starting tier)")
+    parser.add_argument('--bars', type=int, help="bar count (default: the tier's)")
+    parser.add_argument('--fps', type=int, default=0,
+                        help="frame-rate cap (default 0: uncapped, as fast as it renders)")
+    parser.add_argument('--art', help="image to use as album art (default: placeholder)")
+    parser.add_argument('--qr', action='store_true', help="show the QR vinyl instead of the record")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    import pygame
+    import ScrobbleDaddy as app
+    from quality import TIERS, tier_index
+    from setup_server import SETUP_PORT, generate_qr_surface
+
+    if args.tier or args.bars:
+        tier = TIERS[tier_index(args.tier)] if args.tier else app.quality
+        app.apply_quality(tier._replace(bars=args.bars or tier.bars))
+
+    audio = app.audio_settings
+    source = SyntheticAudio(audio['sample_rate'], audio['chunk_size'],
+                            app.config['audio']['record_seconds'], signal=args.signal,
+                            decimate=audio['decimate'])
+    app.capture = source
+    app.dirty_rects = args.mode == 'dirty'
+    app.setup_qr_surface = generate_qr_surface(f"http://127.0.0.1:{SETUP_PORT}")
+    app.show_qr = args.qr
+    app.last_track_title = "A Deliberately Long Track Title So The Strip Has To Scroll"
+    app.last_artist_name = "Benchmark Artist"
+    app.current_cover_path = args.art
+
+    stages = FrameStages()
+    clock = pygame.time.Clock()
+    fps = args.fps or app.TARGET_FPS
+    hop = max(1, audio['sample_rate'] // fps)
+    source.feed(audio['sample_rate'])  # One second, so the first FFT window is full
+
+    try:
+        for i in range(args.warmup + args.frames):
+            app.frame_stages = stages if i >= args.warmup else None
+            start = time.perf_counter()
+
+            with app.stage('capture'):
+                source.feed(hop)
+            app.render_frame(1.0 / fps, force=(i == 0))
+
+            if app.frame_stages is not None:
+                stages.end_frame(time.perf_counter() - start)
+            pygame.event.pump()
+            clock.tick(args.fps)
+    finally:
+        app.frame_stages = None
+        app.stopApp()
+
+    report = {
+        'signal': args.signal,
+        'mode': args.mode,
+        'frames': args.frames,
+        'fps_cap': args.fps,
+        'screen': [app.WIDTH, app.HEIGHT],
+        'tier': app.quality.name,
+        'num_bars': app.NUM_BARS,
+        'reflection': app.quality.reflection,
+        'fft_size': app.fft_size,
+        'hop': app.spectrum.hop,
+        'sample_rate': audio['sample_rate'],
+        'visual_rate': source.visual.sample_rate,
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'machine': platform.machine(),
+        'stages': stages.summary(),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+"""
+ScrobbleDaddy - Time-to-Identify Benchmark
+
+Plays recorded sessions (WAV files) into the capture ring in real time and
+identifies the same stretch of audio both ways: the fixed `record_seconds`
+window, and the race of growing clips (`recognition.clip_seconds`). Prints
+the median time-to-identify of each, their hit rates and how often they
+named the same track, as JSON.
+
+Needs shazamio and network access, like the app itself.
+
+Usage: python benchmarks/time_to_identify.py session.wav [more.wav] [--trials 5] [--clips 3,5,8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from audio_capture import AudioCapture, encode_wav  # noqa: E402
+from history import track_key  # noqa: E402
+from recognition import ClipRace  # noqa: E402
+
+
+class WavPlayer(AudioCapture):
+    """A WAV file played into the ring at real-time speed, from any offset."""
+
+    def __init__(self, path, seconds, chunk_size=1024):
+        with wave.open(path, 'rb') as f:
+            if f.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit PCM")
+            channels = f.getnchannels()
+            rate = f.getframerate()
+            audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        super().__init__(rate, chunk_size, seconds)
+        self.path = path
+        self.audio = audio[::channels]
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def duration(self):
+        return len(self.audio) / self.sample_rate
+
+    def play(self, offset):
+        self.stop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._play, args=(int(offset * self.sample_rate),),
+                                        daemon=True)
+        self._thread.start()
+
+    def _play(self, position):
+        start = time.perf_counter()
+        sent = 0
+        while not self._stop.is_set() and position + sent < len(self.audio):
+            self.write(self.audio[position + sent:position + sent + self.chunk_size])
+            sent += self.chunk_size
+            delay = start + sent / self.sample_rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+
+def result_key(result):
+    return track_key(result['track']) if result and 'track' in result else None
+
+
+async def fixed_window(shazam, player, window):
+    start = time.perf_counter()
+    samples = await asyncio.get_event_loop().run_in_executor(None, player.record, window)
+    if samples is None:
+        return None, None
+    result = await shazam.recognize(encode_wav(samples, player.sample_rate))
+    return result_key(result), time.perf_counter() - start
+
+
+async def clip_race(shazam, player, race):
+    async def recognize(samples):
+        return await shazam.recognize(encode_wav(samples, player.sample_rate))
+
+    outcome = await race.run(player, recognize, result_key)
+    if outcome is None:
+        return None, None
+    return result_key(outcome.answer), outcome.seconds
+
+
+def summarize(runs):
+    times = [seconds for key, seconds in runs if key is not None]
+    return {
+        'trials': len(runs),
+        'hit_rate': round(len(times) / len(runs), 3) if runs else None,
+        'median_s': round(float(np.median(times)), 3) if times else None,
+        'p90_s': round(float(np.percentile(times, 90)), 3) if times else None,
+    }
+
+
+async def run(args):
+    from shazamio import Shazam
+
+    shazam = Shazam()
+    race = ClipRace([float(s) for s in args.clips.split(',')], agree=args.agree)
+    longest = max(args.window, max(race.clip_seconds))
+    rng = random.Random(args.seed)
+    fixed, raced, same = [], [], 0
+
+    for path in args.wavs:
+        player = WavPlayer(path, longest)
+        for trial in range(args.trials):
+            offset = rng.uniform(0, max(0.0, player.duration - longest - 1))
+            try:
+                player.play(offset)
+                fixed_key, fixed_seconds = await fixed_window(shazam, player, args.window)
+                player.play(offset)
+                race_key, race_seconds = await clip_race(shazam, player, race)
+            finally:
+                player.stop()
+            fixed.append((fixed_key, fixed_seconds))
+            raced.append((race_key, race_seconds))
+            same += fixed_key is not None and fixed_key == race_key
+            print(f"{os.path.basename(path)} @{offset:.0f}s: fixed {fixed_key} in {fixed_seconds}s, "
+                  f"race {race_key} in {race_seconds}s", file=sys.stderr)
+
+    fixed_summary, race_summary = summarize(fixed), summarize(raced)
+    speedup = None
+    if fixed_summary['median_s'] and race_summary['median_s']:
+        speedup = round(fixed_summary['median_s'] / race_summary['median_s'], 2)
+    return {
+        'window_s': args.window,
+        'clips_s': race.clip_seconds,
+        'agree': race.agree,
+        'fixed': fixed_summary,
+        'race': race_summary,
+        'same_track': same,
+        'median_speedup': speedup,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('wavs', nargs='+', help="recorded sessions (16-bit PCM WAV)")
+    parser.add_argument('--trials', type=int, default=5, help="random offsets per file")
+    parser.add_argument('--window', type=float, default=10, help="fixed window, as audio.record_seconds")
+    parser.add_argument('--clips', default='3,5,8', help="race clip lengths in seconds")
+    parser.add_argument('--agree', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    text = json.dumps(asyncio.run(run(args)), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+ScrobbleDaddy - Track Change Detector Evaluation
+
+Runs recorded listening sessions (WAV files) through the same visualizer
+analysis and TrackChangeDetector the app uses, as fast as it can, and
+scores the triggers against labelled track boundaries. Give several values
+for a threshold to sweep them; results are sorted by F1.
+
+Boundaries come from `<session>.txt` next to each WAV (or `--labels`): one
+time in seconds per line, or an Audacity label export (start, end, text).
+
+Usage: python benchmarks/track_changes.py session.wav [--novelty 0.2,0.3,0.4] [--gap-seconds 0.5,1]
+
+Run it from the repo root — defaults come from config.json. The bars are
+computed as the app would: its audio profile (`--pi` for the Pi's) and
+starting quality tier, unless `--visualizer-rate`, `--fft-size` or `--bars`
+say otherwise.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from audio_capture import AudioCapture, audio_profile  # noqa: E402
+from quality import TIERS, tier_index  # noqa: E402
+from spectrum import SpectrumAnalyzer  # noqa: E402
+from track_change import TrackChangeDetector  # noqa: E402
+
+PARAMS = ('novelty', 'novelty_seconds', 'gap_seconds', 'cooldown')
+
+
+def load_wav(path):
+    with wave.open(path, 'rb') as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM")
+        channels = f.getnchannels()
+        audio = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16)
+        return audio[::channels], f.getframerate()
+
+
+def load_labels(path):
+    """Boundary times in seconds: a bare time, or Audacity's start/end/text, per line."""
+    times = []
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                times.append(float(fields[0]))
+    return sorted(times)
+
+
+def start_tier(gui, is_pi):
+    """The quality tier the app starts in: gui.quality, or auto's starting tier."""
+    try:
+        return TIERS[tier_index(gui.get('quality', 'auto'))]
+    except ValueError:
+        return TIERS[tier_index('medium' if is_pi else 'high')]
+
+
+def analyze(audio, sample_rate, visualizer_rate, fft_size, num_bars, hop_ms, fps, **spectrum_options):
+    """Per-frame (time, levels, rms), exactly as the render loop would see them.
+
+    `fft_size` is at the full sample rate, as quality tiers give it.
+    """
+    decimate = max(1, round(sample_rate / visualizer_rate))
+    capture = AudioCapture(sample_rate, 1024, 2, decimate=decimate)
+    visual = capture.visual
+    size = max(256, fft_size // decimate)
+    spectrum = SpectrumAnalyzer(1 << (size.bit_length() - 1), visual.sample_rate, num_bars,
+                                hop=max(1, round(visual.sample_rate * hop_ms / 1000)),
+                                **spectrum_options)
+
+    frames = []
+    per_frame = sample_rate / fps
+    fed = 0
+    for i in range(int(len(audio) / per_frame)):
+        end = int((i + 1) * per_frame)
+        capture.write(audio[fed:end])
+        fed = end
+        spectrum.update(visual)
+        levels, _peaks = spectrum.latest()
+        recent = visual.latest(spectrum.hop)
+        rms = float(np.sqrt(np.mean(np.square(recent, dtype=np.float32)))) if len(recent) else 0.0
+        frames.append((end / sample_rate, levels, rms))
+    return frames
+
+
+def detect(frames, silence_rms, **params):
+    detector = TrackChangeDetector(silence_rms=silence_rms, **params)
+    triggers = []
+    for now, levels, rms in frames:
+        reason = detector.observe(levels, rms, now)
+        if reason:
+            triggers.append((now, reason))
+    return triggers
+
+
+def score(triggers, boundaries, tolerance, early=1.0):
+    """Match each boundary to the first unused trigger in [b - early, b + tolerance]."""
+    used = set()
+    latencies = []
+    for boundary in boundaries:
+        for i, (when, _reason) in enumerate(triggers):
+            if i not in used and boundary - early <= when <= boundary + tolerance:
+                used.add(i)
+                latencies.append(when - boundary)
+                break
+    return len(latencies), len(triggers) - len(used), len(boundaries) - len(latencies), latencies
+
+
+def main():
+    with open('config.json') as f:
+        config = json.load(f)
+    audio = config['audio']
+    gui = config.get('gui', {})
+    recognition = config.get('recognition', {})
+
+    def default(key, value):
+        return str(recognition.get(key, value))
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('wavs', nargs='+', help="recorded sessions (16-bit PCM WAV)")
+    parser.add_argument('--labels', nargs='*', help="boundary files, one per WAV (default: <wav>.txt)")
+    parser.add_argument('--novelty', default=default('change_novelty', 0.15),
+                        help="novelty thresholds to try, comma-separated (default: config.json's)")
+    parser.add_argument('--novelty-seconds', default=default('change_novelty_seconds', 1.5))
+    parser.add_argument('--gap-seconds', default=default('change_gap_seconds', 0.8))
+    parser.add_argument('--cooldown', default=default('change_cooldown', 20))
+    parser.add_argument('--tolerance', type=float, default=5.0,
+                        help="seconds after a boundary a trigger still counts")
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--pi', action='store_true', help="use the Pi's audio profile and starting tier")
+    parser.add_argument('--tier', choices=[tier.name for tier in TIERS],
+                        help="quality tier for FFT size and bars (default: the app's starting tier)")
+    parser.add_argument('--visualizer-rate', type=int,
+                        help="visualizer sample rate (default: the audio profile's)")
+    parser.add_argument('--fft-size', type=int,
+                        help="FFT window at the full sample rate (default: the tier's)")
+    parser.add_argument('--bars', type=int, help="bar count (default: the tier's)")
+    parser.add_argument('--verbose', action='store_true', help="list every trigger of the best run")
+    parser.add_argument('--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    profile = audio_profile(audio, args.pi)
+    tier = TIERS[tier_index(args.tier)] if args.tier else start_tier(gui, args.pi)
+    visualizer_rate = args.visualizer_rate or profile['sample_rate'] / profile['decimate']
+    fft_size = args.fft_size or tier.fft_size
+    num_bars = args.bars or tier.bars
+    spectrum_options = {
+        'attack': gui.get('bar_attack_ms', 20) / 1000,
+        'release': gui.get('bar_release_ms', 250) / 1000,
+        'peak_hold': gui.get('peak_hold_ms', 500) / 1000,
+    }
+    print(f"Visualizer: {visualizer_rate:.0f} Hz, FFT {fft_size}, {num_bars} bars "
+          f"(tier {tier.name})", file=sys.stderr)
+
+    sessions = []
+    for i, path in enumerate(args.wavs):
+        labels = args.labels[i] if args.labels else os.path.splitext(path)[0] + '.txt'
+        samples, rate = load_wav(path)
+        print(f"Analyzing {path} ({len(samples) / rate / 60:.1f} min)...", file=sys.stderr)
+        frames = analyze(samples, rate, visualizer_rate, fft_size, num_bars,
+                         audio.get('hop_ms', 10), args.fps, **spectrum_options)
+        sessions.append((path, frames, load_labels(labels), len(samples) / rate))
+
+    grid = [[float(v) for v in getattr(args, name).split(',')] for name in PARAMS]
+    runs = []
+    for values in itertools.product(*grid):
+        params = dict(zip(PARAMS, values))
+        hits = false = missed = 0
+        latencies, triggers = [], {}
+        for path, frames, boundaries, _seconds in sessions:
+            found = detect(frames, recognition.get('silence_rms', 150), **params)
+            h, f, m, lat = score(found, boundaries, args.tolerance)
+            hits, false, missed = hits + h, false + f, missed + m
+            latencies += lat
+            triggers[path] = [(round(when, 1), reason) for when, reason in found]
+        precision = hits / (hits + false) if hits + false else 0.0
+        recall = hits / (hits + missed) if hits + missed else 0.0
+        hours = sum(seconds for *_rest, seconds in sessions) / 3600
+        runs.append({
+            'params': params,
+            'precision': round(precision, 3),
+            'recall': round(recall, 3),
+            'f1': round(2 * precision * recall / (precision + recall), 3) if precision + recall else 0.0,
+            'median_latency_s': round(float(np.median(latencies)), 2) if latencies else None,
+            'false_per_hour': round(false / hours, 1) if hours else None,
+            'triggers': triggers,
+        })
+
+    runs.sort(key=lambda run: run['f1'], reverse=True)
+    for i, run in enumerate(runs):
+        if i or not args.verbose:
+            del run['triggers']
+    report = {
+        'sessions': [path for path, *_rest in sessions],
+        'boundaries': sum(len(boundaries) for _path, _frames, boundaries, _seconds in sessions),
+        'tolerance_s': args.tolerance,
+        'visualizer': {'rate': round(visualizer_rate), 'fft_size': fft_size, 'bars': num_bars},
+        'runs': runs,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+ScrobbleDaddy - Cover Art Cache
+
+Content-addressed on-disk cache of album art, keyed by a hash of the URL:
+
+1. Downloads run on a background thread, off the recognition path
+2. Files are capped in total size and evicted least recently used first
+3. Decoded, scaled surfaces are kept in memory too, so going back to a
+   recent album skips both the network and the JPEG decode
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class CoverArtCache:
+    """Disk + surface cache for cover art, with background downloads."""
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, max_surfaces=8,
+                 get_session=None, timeout=10, latency=None, executor=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_surfaces = max_surfaces
+        self.timeout = timeout
+        self.latency = latency
+        self._get_session = get_session
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+        self._surfaces = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, url):
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.jpg')
+
+    def fetch(self, url, on_ready):
+        """Call `on_ready(url, path)` once the art for `url` is on disk."""
+        path = self.path_for(url)
+        if os.path.exists(path):
+            os.utime(path)  # Mark as recently used
+            on_ready(url, path)
+            return
+        self._executor.submit(self._download, url, path, on_ready)
+
+    def _download(self, url, path, on_ready):
+        try:
+            if self._get_session is not None:
+                session = self._get_session()
+            else:
+                import requests
+                session = requests
+            if self.latency is not None:
+                with self.latency.timed('cover_art'):
+                    response = session.get(url, timeout=self.timeout)
+            else:
+                response = session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+
+            tmp_path = path + '.part'
+            with open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Cover art download failed: {e}")
+            return
+
+        self._evict()
+        on_ready(url, path)
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            full = os.path.join(self.directory, name)
+            try:
+                st = os.stat(full)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, full))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def surface(self, path, size):
+        """Return the decoded, scaled surface for `path` (decodes once)."""
+        import pygame
+
+        if path is None:
+            return None
+        key = (path, size)
+        with self._lock:
+            img = self._surfaces.get(key)
+            if img is not None:
+                self._surfaces.move_to_end(key)
+                return img
+        try:
+            img = pygame.image.load(path).convert()
+            img = pygame.transform.scale(img, size)
+        except (pygame.error, FileNotFoundError):
+            return None
+        with self._lock:
+            self._surfaces[key] = img
+            while len(self._surfaces) > self.max_surfaces:
+                self._surfaces.popitem(last=False)
+        return img
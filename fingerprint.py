@@ -0,0 +1,200 @@
+"""
+ScrobbleDaddy - Local Fingerprint Index
+
+Identifies records we've already played without going to the network:
+
+1. Clips that Shazam matched are reduced to landmark hashes — pairs of
+   spectrogram peaks packed as (f1, f2, dt) — and stored in SQLite,
+   indexed by hash, together with the original Shazam result
+2. New clips are hashed the same way and looked up locally first; a track
+   wins when enough of its hashes line up at one consistent time offset
+3. A local hit returns the stored track with its match details rebuilt
+   from that alignment, not the first match's offset and skews
+4. Only misses go to Shazam
+"""
+
+import json
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+
+# Spectrogram and landmark parameters
+MAX_FREQ_HZ = 4000      # Landmarks above this are mostly noise from a room mic
+FREQ_QUANT_HZ = 8       # 9 bits of frequency up to MAX_FREQ_HZ
+PEAK_NEIGHBORHOOD = (5, 10)  # (frames, bins) half-widths for local maxima
+PEAKS_PER_FRAME = 5
+FAN_OUT = 5
+MAX_DT = 63             # 6 bits of frame delta
+
+
+def _stft_params(sample_rate):
+    n_fft = 1 << int(np.ceil(np.log2(sample_rate * 0.085)))
+    return n_fft, n_fft // 2
+
+
+def _max_filter(values, half_t, half_f):
+    """Separable 2-D sliding maximum over a (time, freq) array."""
+    out = values.copy()
+    for axis, half in ((1, half_f), (0, half_t)):
+        src = out.copy()
+        for shift in range(1, half + 1):
+            fwd = [slice(None)] * 2
+            back = [slice(None)] * 2
+            fwd[axis], back[axis] = slice(shift, None), slice(None, -shift)
+            np.maximum(out[tuple(back)], src[tuple(fwd)], out=out[tuple(back)])
+            np.maximum(out[tuple(fwd)], src[tuple(back)], out=out[tuple(fwd)])
+    return out
+
+
+def fingerprint(samples, sample_rate):
+    """Return (hashes, offsets) landmark arrays for a clip of int16 samples."""
+    n_fft, hop = _stft_params(sample_rate)
+    n_frames = 1 + (len(samples) - n_fft) // hop
+    if n_frames < 2:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+
+    max_bin = int(MAX_FREQ_HZ * n_fft / sample_rate)
+    frames = np.lib.stride_tricks.as_strided(
+        samples, shape=(n_frames, n_fft),
+        strides=(samples.strides[0] * hop, samples.strides[0]))
+    window = np.hanning(n_fft).astype(np.float32)
+    spec = np.log1p(np.abs(np.fft.rfft(frames * window, axis=1))[:, 1:max_bin])
+
+    # Peaks: local maxima that stand out from the clip's overall level,
+    # then the strongest few per frame
+    is_peak = (spec == _max_filter(spec, *PEAK_NEIGHBORHOOD)) & (spec > np.median(spec) + 2.0)
+    t_idx, f_idx = np.nonzero(is_peak)
+    if len(t_idx) < 2:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    strength = spec[t_idx, f_idx]
+    order = np.lexsort((-strength, t_idx))
+    t_idx, f_idx = t_idx[order], f_idx[order]
+    rank = np.arange(len(t_idx)) - np.searchsorted(t_idx, t_idx)
+    keep = rank < PEAKS_PER_FRAME
+    t_idx, f_idx = t_idx[keep], f_idx[keep]
+
+    freq_q = ((f_idx + 1) * sample_rate / n_fft / FREQ_QUANT_HZ).astype(np.int64)
+
+    # Pair each anchor with the next FAN_OUT peaks that fall in its target zone
+    hashes, offsets = [], []
+    for k in range(1, FAN_OUT + 1):
+        dt = t_idx[k:] - t_idx[:-k]
+        ok = (dt > 0) & (dt <= MAX_DT)
+        f1, f2 = freq_q[:-k][ok], freq_q[k:][ok]
+        hashes.append((f1 << 15) | (f2 << 6) | dt[ok])
+        offsets.append(t_idx[:-k][ok])
+    return np.concatenate(hashes), np.concatenate(offsets).astype(np.int64)
+
+
+class FingerprintIndex:
+    """On-disk landmark hash store, filled from Shazam matches."""
+
+    UNALIGNED = 1000000  # Offset base for clips Shazam gave no offset for
+
+    def __init__(self, path, sample_rate, min_score=20, max_clips_per_track=6):
+        self.sample_rate = sample_rate
+        self.min_score = min_score
+        self.max_clips_per_track = max_clips_per_track
+        self._hop_seconds = _stft_params(sample_rate)[1] / sample_rate
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS tracks (
+                id INTEGER PRIMARY KEY,
+                track_key TEXT UNIQUE,
+                result TEXT NOT NULL,
+                clips INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS hashes (
+                hash INTEGER NOT NULL,
+                track_id INTEGER NOT NULL,
+                offset INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS hashes_by_hash ON hashes(hash);
+            CREATE TEMP TABLE IF NOT EXISTS query (hash INTEGER, offset INTEGER);
+        """)
+        self._db.commit()
+
+    def add(self, result, samples):
+        """Store landmarks for a clip Shazam identified as `result`."""
+        track = result.get('track', {})
+        key = track.get('key') or f"{track.get('subtitle')}|{track.get('title')}"
+
+        hashes, offsets = fingerprint(samples, self.sample_rate)
+        if len(hashes) == 0:
+            return
+
+        # Shazam tells us where in the song this clip sits; use it so clips
+        # from different parts of the same track share one time axis
+        try:
+            song_offset = float(result['matches'][0]['offset'])
+        except (KeyError, IndexError, TypeError, ValueError):
+            song_offset = None
+
+        with self._lock:
+            row = self._db.execute("SELECT id, clips FROM tracks WHERE track_key = ?", (key,)).fetchone()
+            if row is None:
+                cur = self._db.execute("INSERT INTO tracks (track_key, result) VALUES (?, ?)",
+                                       (key, json.dumps(result)))
+                track_id, clips = cur.lastrowid, 0
+            else:
+                track_id, clips = row
+            if clips >= self.max_clips_per_track:
+                return
+
+            if song_offset is not None:
+                base = int(round(song_offset / self._hop_seconds))
+            else:
+                base = (clips + 1) * self.UNALIGNED  # Keep unaligned clips apart
+            self._db.executemany(
+                "INSERT INTO hashes (hash, track_id, offset) VALUES (?, ?, ?)",
+                zip(hashes.tolist(), [track_id] * len(hashes), (offsets + base).tolist()))
+            self._db.execute("UPDATE tracks SET clips = clips + 1 WHERE id = ?", (track_id,))
+            self._db.commit()
+
+    def lookup(self, samples):
+        """Return (result, score, seconds) for the best local match, or None.
+
+        `result` is the stored Shazam result with `matches` replaced: the
+        clip's offset in the song from the landmark alignment (when the
+        track's clips were aligned) and no skews, which we don't measure.
+        """
+        start = time.perf_counter()
+        hashes, offsets = fingerprint(samples, self.sample_rate)
+        if len(hashes) == 0:
+            return None
+
+        # Vote for (track, alignment); a true match piles up on one delta
+        with self._lock:
+            self._db.execute("DELETE FROM temp.query")
+            self._db.executemany("INSERT INTO temp.query (hash, offset) VALUES (?, ?)",
+                                 zip(hashes.tolist(), offsets.tolist()))
+            best = self._db.execute("""
+                SELECT h.track_id, h.offset - q.offset AS delta, COUNT(*) AS votes
+                FROM temp.query q JOIN hashes h ON h.hash = q.hash
+                GROUP BY h.track_id, delta
+                ORDER BY votes DESC
+                LIMIT 1
+            """).fetchone()
+            if best is None or best[2] < self.min_score:
+                return None
+            row = self._db.execute("SELECT result FROM tracks WHERE id = ?", (best[0],)).fetchone()
+        if row is None:
+            return None
+
+        result = json.loads(row[0])
+        _track_id, delta, votes = best
+        match = {}
+        if 0 <= delta < self.UNALIGNED:
+            match['offset'] = round(delta * self._hop_seconds, 3)
+        result = {'track': result.get('track', {}), 'matches': [match] if match else []}
+        return result, votes, time.perf_counter() - start
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,168 @@
+"""
+ScrobbleDaddy - Listening History
+
+Every recognition attempt is kept in SQLite (WAL mode) with its Shazam
+track key, match confidence and latency: hits, misses, repeats of the track
+already on screen, and clips the gate skipped. Queries stay indexed however
+large the table grows:
+
+1. Pages walk the (timestamp) or (outcome, timestamp) index backwards from
+   a keyset cursor, so the thousandth page costs the same as the first
+2. Hits also bump a per-day, per-track rollup, so top-N for a date range
+   reads one row per track per day instead of every recognition
+3. Recording is one insert (plus an upsert for hits) per attempt
+"""
+
+import datetime
+import sqlite3
+import threading
+import time
+
+OUTCOMES = ('hit', 'duplicate', 'miss', 'skipped')
+
+_COLUMNS = ('id', 'timestamp', 'outcome', 'source', 'reason', 'track_key', 'title', 'artist',
+            'score', 'offset', 'time_skew', 'frequency_skew', 'latency_ms')
+
+
+def track_key(track):
+    """Shazam's key for a track, or artist|title when it has none."""
+    return track.get('key') or f"{track.get('subtitle')}|{track.get('title')}"
+
+
+def parse_day(text):
+    """A 'YYYY-MM-DD' string as a date (ValueError if malformed)."""
+    return datetime.date.fromisoformat(text)
+
+
+def _day_start(day):
+    return time.mktime(day.timetuple())
+
+
+class ListeningHistory:
+    """Indexed log of recognition attempts with a daily play rollup."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS recognitions (
+                id INTEGER PRIMARY KEY,
+                timestamp REAL NOT NULL,
+                outcome TEXT NOT NULL,
+                source TEXT,
+                reason TEXT,
+                track_key TEXT,
+                title TEXT,
+                artist TEXT,
+                score REAL,
+                offset REAL,
+                time_skew REAL,
+                frequency_skew REAL,
+                latency_ms REAL
+            );
+            CREATE INDEX IF NOT EXISTS recognitions_time ON recognitions (timestamp);
+            CREATE INDEX IF NOT EXISTS recognitions_outcome_time ON recognitions (outcome, timestamp);
+            CREATE TABLE IF NOT EXISTS daily_plays (
+                day TEXT NOT NULL,
+                track_key TEXT NOT NULL,
+                title TEXT,
+                artist TEXT,
+                plays INTEGER NOT NULL,
+                PRIMARY KEY (day, track_key)
+            ) WITHOUT ROWID;
+        """)
+        self._db.commit()
+
+    # --- Recording ---
+
+    def record(self, outcome, result=None, source=None, reason=None, score=None,
+               latency=None, timestamp=None):
+        """Log one recognition attempt.
+
+        `result` is the Shazam (or locally matched) response, `score` the
+        local landmark count and `latency` the seconds it took to identify.
+        """
+        if outcome not in OUTCOMES:
+            raise ValueError(f"Unknown outcome {outcome!r}")
+        timestamp = time.time() if timestamp is None else timestamp
+
+        key = title = artist = offset = time_skew = frequency_skew = None
+        if result and 'track' in result:
+            track = result['track']
+            key, title, artist = track_key(track), track.get('title'), track.get('subtitle')
+        if result and result.get('matches'):
+            match = result['matches'][0]
+            offset = match.get('offset')
+            time_skew = match.get('timeskew')
+            frequency_skew = match.get('frequencyskew')
+
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO recognitions (timestamp, outcome, source, reason, track_key, title, "
+                "artist, score, offset, time_skew, frequency_skew, latency_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (timestamp, outcome, source, reason, key, title, artist, score, offset,
+                 time_skew, frequency_skew, None if latency is None else latency * 1000))
+            if outcome == 'hit' and key is not None:
+                day = datetime.date.fromtimestamp(timestamp).isoformat()
+                self._db.execute(
+                    "INSERT INTO daily_plays (day, track_key, title, artist, plays) "
+                    "VALUES (?, ?, ?, ?, 1) "
+                    "ON CONFLICT (day, track_key) DO UPDATE SET plays = plays + 1",
+                    (day, key, title, artist))
+            self._db.commit()
+
+    # --- Queries ---
+
+    def page(self, limit=50, before=None, outcome=None, start=None, end=None):
+        """Newest-first entries, `limit` at a time.
+
+        `before` is the `next` cursor from the previous page; `start`/`end`
+        are dates (end inclusive). Returns {'entries': [...], 'next': cursor
+        or None}.
+        """
+        clauses, params = [], []
+        if outcome is not None:
+            if outcome not in OUTCOMES:
+                raise ValueError(f"Unknown outcome {outcome!r}")
+            clauses.append("outcome = ?")
+            params.append(outcome)
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_day_start(start))
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(_day_start(end + datetime.timedelta(days=1)))
+        if before is not None:
+            before_ts, _, before_id = before.partition(':')
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend((float(before_ts), int(before_id)))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM recognitions {where} "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?", (*params, limit)).fetchall()
+
+        entries = [dict(zip(_COLUMNS, row)) for row in rows]
+        cursor = None
+        if len(entries) == limit:
+            cursor = f"{entries[-1]['timestamp']!r}:{entries[-1]['id']}"
+        return {'entries': entries, 'next': cursor}
+
+    def top(self, start, end, limit=10):
+        """Most played tracks (hits) between two dates, inclusive."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT track_key, MAX(title), MAX(artist), SUM(plays) AS total FROM daily_plays "
+                "WHERE day BETWEEN ? AND ? GROUP BY track_key "
+                "ORDER BY total DESC, track_key LIMIT ?",
+                (start.isoformat(), end.isoformat(), limit)).fetchall()
+        return [{'track_key': key, 'title': title, 'artist': artist, 'plays': plays}
+                for key, title, artist, plays in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
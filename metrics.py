@@ -0,0 +1,200 @@
+"""
+ScrobbleDaddy - Runtime Metrics
+
+Counters, gauges and fixed-bucket histograms kept in memory and served by
+the setup server as Prometheus text (`/metrics`) and JSON (`/metrics.json`):
+
+1. Recording is a bisect and a few additions under an uncontended lock,
+   cheap enough to call every frame on the render thread
+2. Nothing is formatted until someone scrapes an endpoint
+3. Gauges are read through a callback at scrape time (e.g. queue depth)
+"""
+
+import bisect
+import threading
+
+# Seconds — covers 0.1ms bands reads through 10s network round trips
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.016,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in key) + '}'
+
+
+class Counter:
+    """Monotonic count, optionally split by labels (e.g. result="hit")."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def prometheus(self):
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._samples()]
+
+    def snapshot(self):
+        return {_format_labels(key) or 'total': value for key, value in self._samples()}
+
+
+class Gauge:
+    """Point-in-time value read from a callback when scraped."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def _value(self):
+        try:
+            return self.read()
+        except Exception:
+            return None
+
+    def prometheus(self):
+        value = self._value()
+        return [] if value is None else [f"{self.name} {value}"]
+
+    def snapshot(self):
+        return self._value()
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += seconds
+            self._count += 1
+
+    def _state(self):
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+    def quantile(self, q, counts=None, count=None):
+        """Estimate a quantile by interpolating inside its bucket."""
+        if counts is None:
+            counts, _sum, count = self._state()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def prometheus(self):
+        counts, total, count = self._state()
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + ('+Inf',), counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {count}")
+        return lines
+
+    def snapshot(self):
+        counts, total, count = self._state()
+
+        def ms(q):
+            value = self.quantile(q, counts, count)
+            return None if value is None else round(value * 1000, 3)
+
+        return {
+            'count': count,
+            'mean_ms': round(total / count * 1000, 3) if count else None,
+            'p50_ms': ms(0.5),
+            'p90_ms': ms(0.9),
+            'p99_ms': ms(0.99),
+        }
+
+
+class MetricsRegistry:
+    """All of the app's metrics, by name, with a common prefix."""
+
+    def __init__(self, prefix='scrobbledaddy_'):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, *args):
+        full_name = self.prefix + name
+        with self._lock:
+            metric = self._metrics.get(full_name)
+            if metric is None:
+                metric = cls(full_name, *args)
+                self._metrics[full_name] = metric
+            return metric
+
+    def counter(self, name, help_text=''):
+        return self._get(Counter, name, help_text)
+
+    def histogram(self, name, help_text='', buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets)
+
+    def gauge(self, name, help_text, read):
+        return self._get(Gauge, name, help_text, read)
+
+    def prometheus(self):
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            if metric.help:
+                lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.prometheus())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """Every metric as plain JSON-serializable values."""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {name[len(self.prefix):]: metric.snapshot() for name, metric in metrics}
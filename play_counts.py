@@ -0,0 +1,100 @@
+"""
+ScrobbleDaddy - Play Count Cache
+
+Keeps Last.fm play counts per (artist, title) so the "plays" line can be
+shown the moment a track is detected:
+
+1. Entries expire after a TTL and the least recently used are evicted
+2. Misses and expired entries are refreshed in the background
+3. Each successful scrobble adds one locally instead of asking Last.fm;
+   while a refresh is in flight, only plays scrobbled after its request
+   went out are added to its answer
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PlayCountCache:
+    """TTL + LRU cache of play counts with background refresh."""
+
+    def __init__(self, fetch, ttl=3600, max_entries=256, executor=None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.on_update = None
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = executor or ThreadPoolExecutor(max_workers=1)
+
+    @staticmethod
+    def _key(artist, title):
+        return artist.strip().lower(), title.strip().lower()
+
+    def get(self, artist, title):
+        """Return the cached count (possibly stale) or None; refresh if needed."""
+        key = self._key(artist, title)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            stale = entry is None or time.monotonic() >= entry['expires']
+            if stale and (entry is None or entry['fetching'] is None):
+                entry = self._touch(key)
+                entry['fetching'] = []  # When each play during the refresh was scrobbled
+                self._executor.submit(self._refresh, key, artist, title)
+            return entry['count']
+
+    def increment(self, artist, title):
+        """Count one more play after a successful scrobble."""
+        key = self._key(artist, title)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['count'] is not None:
+                entry['count'] += 1
+            if entry['fetching'] is not None:
+                # Last.fm may not have counted this play yet when it answers
+                entry['fetching'].append(time.monotonic())
+            count = entry['count']
+        self._notify(artist, title, count)
+        return count
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {'count': None, 'expires': 0.0, 'fetching': None}
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _refresh(self, key, artist, title):
+        sent = time.monotonic()
+        try:
+            count = int(self.fetch(artist, title))
+        except Exception as e:
+            print(f"Error getting play count: {e}")
+            count = None
+
+        with self._lock:
+            entry = self._touch(key)
+            bumps = entry['fetching'] or []
+            entry['fetching'] = None
+            if count is None:
+                # Keep whatever we had and try again after a short pause
+                entry['expires'] = time.monotonic() + min(self.ttl, 60)
+                return
+            # Plays scrobbled before the request went out are in Last.fm's answer
+            count += sum(1 for when in bumps if when >= sent)
+            entry['count'] = count
+            entry['expires'] = time.monotonic() + self.ttl
+        self._notify(artist, title, count)
+
+    def _notify(self, artist, title, count):
+        if self.on_update is not None and count is not None:
+            self.on_update(artist, title, count)
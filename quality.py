@@ -0,0 +1,113 @@
+"""
+ScrobbleDaddy - Adaptive Quality Governor
+
+Watches how long frames take to render and how busy the process is, and
+steps through quality tiers so a Pi keeps a steady frame rate instead of
+stuttering:
+
+1. Each tier sets the frame rate, bar count, reflection, vinyl rotation
+   steps and FFT size
+2. Dropping a tier needs a couple of bad windows in a row; climbing back
+   needs several good ones and a cooldown, so the tier doesn't flap
+3. Every tier change is logged with the numbers that triggered it
+"""
+
+import time
+from collections import namedtuple
+
+QualityTier = namedtuple('QualityTier', 'name fps bars reflection vinyl_frames fft_size')
+
+# Best first; the governor only ever moves one step at a time
+TIERS = (
+    QualityTier('high', fps=60, bars=48, reflection=True, vinyl_frames=90, fft_size=8192),
+    QualityTier('medium', fps=45, bars=48, reflection=True, vinyl_frames=60, fft_size=4096),
+    QualityTier('low', fps=30, bars=32, reflection=False, vinyl_frames=45, fft_size=4096),
+    QualityTier('minimal', fps=24, bars=24, reflection=False, vinyl_frames=30, fft_size=2048),
+)
+
+
+def tier_index(name, tiers=TIERS):
+    for i, tier in enumerate(tiers):
+        if tier.name == name:
+            return i
+    raise ValueError(f"Unknown quality tier {name!r}; expected one of {', '.join(t.name for t in tiers)}")
+
+
+class QualityGovernor:
+    """Picks a quality tier from measured frame time and CPU load.
+
+    `frame_load` is render work per frame divided by the tier's frame
+    budget (1 / fps); `cpu_load` is process CPU time over wall time, in
+    cores. Call `observe()` every frame and `evaluate()` every few seconds;
+    `evaluate()` returns the new tier when it changes, else None.
+    """
+
+    def __init__(self, tiers=TIERS, start=0, down_load=0.85, up_load=0.5,
+                 max_cpu=0.9, down_after=2, up_after=5, cooldown=20.0):
+        self.tiers = tiers
+        self.index = start
+        self.down_load = down_load
+        self.up_load = up_load
+        self.max_cpu = max_cpu
+        self.down_after = down_after
+        self.up_after = up_after
+        self.cooldown = cooldown
+        self.changes = 0
+
+        self._bad = 0
+        self._good = 0
+        self._changed_at = time.monotonic()
+        self._reset_window()
+
+    @property
+    def tier(self):
+        return self.tiers[self.index]
+
+    def _reset_window(self):
+        self._frames = 0
+        self._work = 0.0
+        self._wall_start = time.monotonic()
+        self._cpu_start = time.process_time()
+
+    def observe(self, work_seconds):
+        """Record one frame's render work (cheap; call every frame)."""
+        self._frames += 1
+        self._work += work_seconds
+
+    def evaluate(self):
+        """Close the current window and step a tier if warranted."""
+        wall = time.monotonic() - self._wall_start
+        if self._frames == 0 or wall <= 0:
+            return None
+
+        tier = self.tier
+        frame_load = (self._work / self._frames) * tier.fps
+        cpu_load = (time.process_time() - self._cpu_start) / wall
+        fps = self._frames / wall
+        self._reset_window()
+
+        if frame_load > self.down_load or cpu_load > self.max_cpu or fps < tier.fps * 0.9:
+            self._bad += 1
+            self._good = 0
+        elif frame_load < self.up_load and cpu_load < self.max_cpu * 0.75:
+            self._good += 1
+            self._bad = 0
+        else:
+            self._bad = self._good = 0
+
+        step = 0
+        if self._bad >= self.down_after and self.index < len(self.tiers) - 1:
+            step = 1
+        elif (self._good >= self.up_after and self.index > 0
+              and time.monotonic() - self._changed_at >= self.cooldown):
+            step = -1
+        if not step:
+            return None
+
+        self.index += step
+        self.changes += 1
+        self._bad = self._good = 0
+        self._changed_at = time.monotonic()
+        print(f"Quality {'down' if step > 0 else 'up'}: {tier.name} -> {self.tier.name} "
+              f"(frame load {frame_load:.0%}, CPU {cpu_load:.0%}, {fps:.0f}/{tier.fps} FPS)")
+        return self.tier
@@ -0,0 +1,367 @@
+"""
+ScrobbleDaddy - Recognition Worker
+
+Runs song recognition on one long-lived thread with one asyncio event loop,
+instead of building a new loop, HTTP session and TLS connection every cycle:
+
+1. A single Shazam client backed by a pooled, keep-alive aiohttp session
+2. A pooled requests.Session for cover-art downloads
+3. Per-request latency tracking so connection reuse can be measured (also
+   fed into the metrics registry as `<name>_seconds` histograms)
+4. A gate that skips silent or unchanged clips and backs off exponentially
+5. Optionally, a race of growing clips (e.g. 3, 5 and 8 s) sent while the
+   audio is still arriving, so a track can be named well before a full
+   `record_seconds` window has even been recorded
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+
+from spectrum import BandAggregator
+
+
+class LatencyTracker:
+    """Rolling per-request latency samples, keyed by request name."""
+
+    def __init__(self, window=50, metrics=None):
+        self.window = window
+        self.metrics = metrics
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = deque(maxlen=self.window)
+            self._samples[name].append(seconds)
+        if self.metrics is not None:
+            self.metrics.histogram(f"{name}_seconds", f"{name} latency").observe(seconds)
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def summary(self):
+        """Return {name: (count, first_ms, avg_ms, median_ms, last_ms)} for the window."""
+        with self._lock:
+            snapshot = {name: list(samples) for name, samples in self._samples.items()}
+        result = {}
+        for name, samples in snapshot.items():
+            if samples:
+                result[name] = (
+                    len(samples),
+                    samples[0] * 1000,
+                    sum(samples) / len(samples) * 1000,
+                    float(np.median(samples)) * 1000,
+                    samples[-1] * 1000,
+                )
+        return result
+
+    def report(self):
+        for name, (count, first, avg, median, last) in sorted(self.summary().items()):
+            print(f"  {name}: n={count} first={first:.0f}ms avg={avg:.0f}ms "
+                  f"median={median:.0f}ms last={last:.0f}ms")
+
+
+class RecognitionGate:
+    """Decides whether a clip is worth sending to Shazam.
+
+    Skips clips that are silent (RMS below `silence_rms`) or whose coarse
+    spectral signature still matches the last confident match. Each skip
+    doubles the wait before the next check, up to `max_backoff` seconds; a
+    recognition is forced anyway once `recheck_interval` seconds have passed.
+    """
+
+    FRAME = 2048
+    FRAMES = 24
+
+    def __init__(self, sample_rate, silence_rms=150, similarity=0.97,
+                 base_backoff=2.5, max_backoff=60, recheck_interval=180):
+        self.silence_rms = silence_rms
+        self.similarity = similarity
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.recheck_interval = recheck_interval
+        self.delay = 0.0
+        self.counts = {'recognized': 0, 'silence': 0, 'unchanged': 0}
+
+        self._bands = BandAggregator(self.FRAME, sample_rate, 24, f_min=100)
+        self._match_signature = None
+        self._last_recognized = 0.0
+        self._forced = False
+
+    def signature(self, samples):
+        """Unit-norm mean log-band spectrum over a handful of frames."""
+        n_frames = len(samples) // self.FRAME
+        if n_frames == 0:
+            return None
+        step = max(1, n_frames // self.FRAMES)
+        frames = samples[:n_frames * self.FRAME].reshape(n_frames, self.FRAME)[::step]
+        sig = np.mean([np.log1p(self._bands(frame)) for frame in frames], axis=0)
+        sig -= sig.mean()
+        norm = np.linalg.norm(sig)
+        return sig / norm if norm > 0 else None
+
+    def check(self, samples):
+        """Return (should_recognize, reason) for a clip."""
+        rms = np.sqrt(np.mean(np.square(samples, dtype=np.float32)))
+        if rms < self.silence_rms:
+            return self._skip('silence')
+
+        overdue = self._forced or time.monotonic() - self._last_recognized >= self.recheck_interval
+        if self._match_signature is not None and not overdue:
+            sig = self.signature(samples)
+            if sig is not None and float(np.dot(sig, self._match_signature)) >= self.similarity:
+                return self._skip('unchanged')
+
+        self.delay = 0.0
+        self._forced = False
+        self.counts['recognized'] += 1
+        self._last_recognized = time.monotonic()
+        return True, 'changed'
+
+    def force(self):
+        """Recognize the next audible clip even if it looks unchanged (a likely new track)."""
+        self._forced = True
+        self.delay = 0.0
+
+    def record_result(self, samples, matched):
+        """Remember the signature of a confident match (or forget on a miss)."""
+        self._match_signature = self.signature(samples) if matched else None
+
+    def _skip(self, reason):
+        self.counts[reason] += 1
+        self.delay = min(self.max_backoff, max(self.base_backoff, self.delay * 2))
+        return False, reason
+
+
+RaceResult = namedtuple('RaceResult', 'answer samples seconds skipped')
+
+
+class ClipRace:
+    """Recognize growing clips of the same audio concurrently; agreement wins.
+
+    Clip i is the first `clip_seconds[i]` seconds from when the race starts,
+    sent as soon as it has been captured, while the longer ones are still
+    recording. When `agree` clips name the same track the others are
+    cancelled; if they never agree, the longest clip that matched wins.
+
+    `recognize(samples)` is a coroutine returning any answer, and
+    `key(answer)` names its track (None for a miss). `check(samples)`, if
+    given, gates the race on the first clip, like RecognitionGate.check.
+    """
+
+    def __init__(self, clip_seconds=(3, 5, 8), agree=2, poll=0.05):
+        self.clip_seconds = sorted(clip_seconds)
+        self.agree = max(1, min(agree, len(self.clip_seconds)))
+        self.poll = poll
+
+    async def clip(self, capture, start, seconds):
+        """The `seconds` of audio from sample `start`, once captured; None if it stalls."""
+        n = int(seconds * capture.sample_rate)
+        deadline = time.monotonic() + seconds * 2 + 1
+        while capture.samples_written < start + n:
+            if capture.closed or time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(self.poll)
+        return capture.window_at(start + n, n)
+
+    async def run(self, capture, recognize, key, check=None):
+        """Race the clips; returns a RaceResult, or None if the input stalled.
+
+        `seconds` runs from the start of the race to the decision, so it is
+        the time-to-identify including the audio waited for. `skipped` is
+        the gate's reason when `check` turned the first clip away.
+        """
+        began = time.perf_counter()
+        start = capture.samples_written
+        first = await self.clip(capture, start, self.clip_seconds[0])
+        if first is None:
+            return None
+        if check is not None:
+            ok, reason = check(first)
+            if not ok:
+                return RaceResult(None, first, time.perf_counter() - began, reason)
+
+        agreeing = {}  # track key -> [(clip seconds, answer, samples)]
+        winner = []
+        tasks = []
+
+        async def attempt(seconds, samples):
+            if samples is None:
+                samples = await self.clip(capture, start, seconds)
+                if samples is None:
+                    return None
+            answer = await recognize(samples)
+            track = key(answer)
+            if track is not None and not winner:
+                votes = agreeing.setdefault(track, [])
+                votes.append((seconds, answer, samples))
+                if len(votes) >= self.agree:
+                    _seconds, answer, samples = max(votes, key=lambda vote: vote[0])
+                    winner.append(RaceResult(answer, samples, time.perf_counter() - began, None))
+                    for task in tasks:
+                        if task is not asyncio.current_task():
+                            task.cancel()
+            return seconds, answer, samples
+
+        tasks.extend(asyncio.ensure_future(attempt(seconds, first if i == 0 else None))
+                     for i, seconds in enumerate(self.clip_seconds))
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        if winner:
+            return winner[0]
+
+        finished = []
+        for outcome in outcomes:
+            if isinstance(outcome, asyncio.CancelledError) or outcome is None:
+                continue
+            if isinstance(outcome, BaseException):
+                print(f"Clip recognition failed: {outcome}")
+                continue
+            finished.append(outcome)
+        if not finished:
+            return None
+        # No agreement: the longest clip that matched, else the longest miss
+        matched = [outcome for outcome in finished if key(outcome[1]) is not None]
+        _seconds, answer, samples = max(matched or finished, key=lambda outcome: outcome[0])
+        return RaceResult(answer, samples, time.perf_counter() - began, None)
+
+
+class PooledHTTPClient:
+    """shazamio-compatible HTTP client that keeps one aiohttp session alive."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._session = None
+
+    async def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=120)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def request(self, method, url, *args, **kwargs):
+        # shazamio passes the expected JSON content type positionally
+        session = await self._get_session()
+        method = getattr(method, 'value', method).upper()
+        async with session.request(method, url, **kwargs) as response:
+            return await response.json(content_type=args[0] if args else None)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+
+class RecognitionWorker:
+    """Long-lived recognition thread: one event loop, reused network clients."""
+
+    def __init__(self, cycle, timeout=10, report_every=10, metrics=None):
+        self.cycle = cycle
+        self.timeout = timeout
+        self.report_every = report_every
+        self.latency = LatencyTracker(metrics=metrics)
+        self.shazam = None
+        self.http = None
+        self.loop = None
+        self._http_client = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self._wake = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        if self.loop is not None and self._wake is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # Loop already closed
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def trigger(self):
+        """Cut the current (or next) sleep short, e.g. on a likely track change."""
+        if self.loop is not None and self._wake is not None:
+            try:
+                self.loop.call_soon_threadsafe(self._wake.set)
+            except RuntimeError:
+                pass  # Loop already closed
+
+    async def sleep(self, seconds):
+        """Sleep on the worker loop, returning early if stopped or triggered."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+        if not self._stopping.is_set():
+            self._wake.clear()
+
+    @property
+    def stopping(self):
+        return self._stopping.is_set()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    def _open_clients(self):
+        import requests
+        from shazamio import Shazam
+
+        self._http_client = PooledHTTPClient(self.timeout)
+        try:
+            self.shazam = Shazam(http_client=self._http_client)
+        except TypeError:
+            # Older shazamio without a pluggable client — still reuse the instance
+            self.shazam = Shazam()
+
+        self.http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=2)
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+
+    async def _close_clients(self):
+        if self._http_client is not None:
+            await self._http_client.close()
+        if self.http is not None:
+            self.http.close()
+
+    async def _main(self):
+        self._wake = asyncio.Event()
+        self._open_clients()
+        cycles = 0
+        try:
+            while not self._stopping.is_set():
+                try:
+                    await self.cycle()
+                except Exception as e:
+                    print(f"Recognition error (retrying): {e}")
+                    await self.sleep(5)
+                cycles += 1
+                if self.report_every and cycles % self.report_every == 0:
+                    print("Request latency:")
+                    self.latency.report()
+        finally:
+            await self._close_clients()
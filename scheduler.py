@@ -0,0 +1,111 @@
+"""
+ScrobbleDaddy - Frame Scheduler
+
+Runs periodic UI work on the render thread, clocked by `clock.tick()`,
+instead of in helper threads that sleep in loops:
+
+1. FrameScheduler is a hashed timer wheel advanced by each frame's time
+2. WorkerPool is a bounded thread pool for work that blocks; the app keeps
+   network I/O and CPU-bound sprite builds in separate pools, so a slow
+   request never holds up the vinyl
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Timer:
+    __slots__ = ('fn', 'interval', 'rounds', 'cancelled')
+
+    def __init__(self, fn, interval):
+        self.fn = fn
+        self.interval = interval
+        self.rounds = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FrameScheduler:
+    """Timer wheel driven by frame time; callbacks run on the calling thread."""
+
+    def __init__(self, tick_ms=50, slots=64):
+        self.tick_ms = tick_ms
+        self.slots = slots
+        self._wheel = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._elapsed_ms = 0.0
+
+    def call_later(self, seconds, fn):
+        """Run `fn()` once after `seconds`; returns a handle with cancel()."""
+        timer = _Timer(fn, None)
+        self._schedule(timer, seconds * 1000)
+        return timer
+
+    def call_every(self, seconds, fn):
+        """Run `fn()` every `seconds`; returns a handle with cancel()."""
+        timer = _Timer(fn, seconds * 1000)
+        self._schedule(timer, timer.interval)
+        return timer
+
+    def _schedule(self, timer, delay_ms):
+        ticks = max(1, int(round(delay_ms / self.tick_ms)))
+        timer.rounds = (ticks - 1) // self.slots
+        self._wheel[(self._cursor + ticks) % self.slots].append(timer)
+
+    def advance(self, dt_ms):
+        """Move the wheel on by one frame's worth of time and fire due timers."""
+        self._elapsed_ms += dt_ms
+        while self._elapsed_ms >= self.tick_ms:
+            self._elapsed_ms -= self.tick_ms
+            self._cursor = (self._cursor + 1) % self.slots
+            slot = self._wheel[self._cursor]
+            if not slot:
+                continue
+            self._wheel[self._cursor] = []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.rounds > 0:
+                    timer.rounds -= 1
+                    self._wheel[self._cursor].append(timer)
+                    continue
+                try:
+                    timer.fn()
+                except Exception as e:
+                    print(f"Scheduled task failed: {e}")
+                if timer.interval is not None and not timer.cancelled:
+                    self._schedule(timer, timer.interval)
+
+    def clear(self):
+        self._wheel = [[] for _ in range(self.slots)]
+
+
+class WorkerPool:
+    """Bounded thread pool that can also dedupe jobs by key."""
+
+    def __init__(self, max_workers=2, name='worker'):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        return self._executor.submit(fn, *args, **kwargs)
+
+    def submit_once(self, key, fn, *args, **kwargs):
+        """Submit unless a job with the same key is still queued or running."""
+        with self._lock:
+            if key in self._in_flight:
+                return None
+            self._in_flight.add(key)
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda _f: self._done(key))
+        return future
+
+    def _done(self, key):
+        with self._lock:
+            self._in_flight.discard(key)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
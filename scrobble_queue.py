@@ -0,0 +1,209 @@
+"""
+ScrobbleDaddy - Durable Scrobble Queue
+
+Scrobbles are written to SQLite (WAL mode) the moment a track is detected,
+then sent to Last.fm in the background by `flush_once()`:
+
+1. Up to 50 scrobbles per request via `scrobble_many`
+2. Exponential backoff while Last.fm or the network is unreachable
+3. A batch Last.fm rejects is retried in halves until the bad scrobbles
+   are alone, so only those are ever dropped
+4. Pending scrobbles survive restarts and offline periods
+5. Queue depth and flush latency are exposed through `status()` and, when
+   a metrics registry is passed in, as counters and a latency histogram
+"""
+
+import sqlite3
+import threading
+import time
+
+# Last.fm error codes that reject the scrobbles themselves (invalid
+# parameters / resource); anything else — outages, rate limits, auth or
+# session trouble — is retried with backoff and never drops a scrobble
+REJECTED_STATUSES = {'6', '7'}
+
+
+class ScrobbleQueue:
+    """Persistent scrobble queue; `flush_once()` sends one batch when due."""
+
+    def __init__(self, path, batch_size=50, base_backoff=5, max_backoff=900, max_rejections=5,
+                 metrics=None):
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_rejections = max_rejections
+        self.on_sent = None
+
+        self._sent_metric = self._failed_metric = self._error_metric = self._flush_metric = None
+        if metrics is not None:
+            self._sent_metric = metrics.counter('scrobbles_sent_total', "Scrobbles accepted by Last.fm")
+            self._failed_metric = metrics.counter('scrobbles_failed_total',
+                                                  "Scrobbles dropped after repeated rejections")
+            self._error_metric = metrics.counter('scrobble_flush_errors_total', "Failed flush attempts")
+            self._flush_metric = metrics.histogram('scrobble_flush_seconds', "scrobble_many round trip")
+            metrics.gauge('scrobble_queue_depth', "Scrobbles waiting to be sent", self.depth)
+
+        self.sent = 0
+        self.failed = 0
+        self.last_flush_seconds = None
+        self.last_error = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self._batch_limit = batch_size
+        self._split_until = None  # Last id of the rejected batch being split
+
+        self._lock = threading.Lock()
+        self._pending = True  # Anything left over from the last run
+
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS scrobbles (
+                id INTEGER PRIMARY KEY,
+                artist TEXT NOT NULL,
+                title TEXT NOT NULL,
+                album TEXT,
+                timestamp INTEGER NOT NULL,
+                rejections INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self._db.commit()
+
+    # --- Producer side ---
+
+    def enqueue(self, artist, title, timestamp, album=None):
+        """Record a scrobble durably; it goes out on the next due flush."""
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO scrobbles (artist, title, album, timestamp) VALUES (?, ?, ?, ?)",
+                (artist, title, album or None, timestamp))
+            self._db.commit()
+            self._pending = True
+
+    def depth(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scrobbles").fetchone()[0]
+
+    def status(self):
+        return {
+            'depth': self.depth(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'last_flush_ms': None if self.last_flush_seconds is None else self.last_flush_seconds * 1000,
+            'retry_in_s': max(0.0, self._retry_at - time.monotonic()),
+            'last_error': self.last_error,
+        }
+
+    def wake(self):
+        """Retry right away, e.g. after Last.fm credentials change."""
+        self._retry_at = 0.0
+        self._pending = True
+
+    def due(self):
+        """True when there may be scrobbles to send and no backoff is running."""
+        return self._pending and time.monotonic() >= self._retry_at
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Flusher ---
+
+    def flush_once(self, network):
+        """Send one batch to Last.fm (blocking); run it on a worker thread."""
+        if network is None:
+            return
+        batch = self._next_batch()
+        if batch:
+            self._flush(network, batch)
+
+    def _next_batch(self):
+        with self._lock:
+            batch = self._db.execute(
+                "SELECT id, artist, title, album, timestamp FROM scrobbles ORDER BY id LIMIT ?",
+                (self._batch_limit,)).fetchall()
+            if not batch:
+                # Under the lock, so a concurrent enqueue() can't be missed
+                self._pending = False
+            return batch
+
+    def _flush(self, network, batch):
+        import pylast
+
+        tracks = []
+        for _id, artist, title, album, timestamp in batch:
+            track = {'artist': artist, 'title': title, 'timestamp': timestamp}
+            if album:
+                track['album'] = album
+            tracks.append(track)
+
+        start = time.perf_counter()
+        try:
+            network.scrobble_many(tracks)
+        except pylast.WSError as e:
+            # Only a rejection of the scrobbles themselves counts against the batch
+            self._flush_failed(e, batch, rejected=str(e.get_id()) in REJECTED_STATUSES)
+            return
+        except Exception as e:
+            self._flush_failed(e, batch, rejected=False)
+            return
+
+        self.last_flush_seconds = time.perf_counter() - start
+        if self._flush_metric is not None:
+            self._flush_metric.observe(self.last_flush_seconds)
+            self._sent_metric.inc(len(batch))
+        self.last_error = None
+        self._backoff = 0.0
+        self._split_done(batch[-1][0])
+        ids = [row[0] for row in batch]
+        with self._lock:
+            self._db.executemany("DELETE FROM scrobbles WHERE id = ?", [(i,) for i in ids])
+            self._db.commit()
+        self.sent += len(batch)
+        print(f"Scrobbled {len(batch)} track(s) in {self.last_flush_seconds * 1000:.0f}ms "
+              f"({self.depth()} queued)")
+        if self.on_sent is not None:
+            for _id, artist, title, _album, _timestamp in batch:
+                self.on_sent(artist, title)
+
+    def _flush_failed(self, error, batch, rejected):
+        if self._error_metric is not None:
+            self._error_metric.inc(reason='rejected' if rejected else 'error')
+        self.last_error = str(error)
+
+        if rejected and len(batch) > 1:
+            # Find the bad scrobbles: retry each half right away, no backoff
+            self._split_until = max(self._split_until or 0, batch[-1][0])
+            self._batch_limit = len(batch) // 2
+            print(f"Last.fm rejected a batch of {len(batch)} ({error}); retrying it in halves")
+            return
+
+        self._backoff = min(self.max_backoff, max(self.base_backoff, self._backoff * 2))
+        self._retry_at = time.monotonic() + self._backoff
+        print(f"Scrobble flush failed ({error}); {len(batch)} kept, retrying in {self._backoff:.0f}s")
+
+        if rejected:
+            # Rejected on its own: count it against this scrobble alone
+            scrobble_id = batch[0][0]
+            with self._lock:
+                self._db.execute(
+                    "UPDATE scrobbles SET rejections = rejections + 1 WHERE id = ?", (scrobble_id,))
+                dropped = self._db.execute(
+                    "DELETE FROM scrobbles WHERE id = ? AND rejections >= ?",
+                    (scrobble_id, self.max_rejections)).rowcount
+                self._db.commit()
+            if dropped:
+                self.failed += dropped
+                if self._failed_metric is not None:
+                    self._failed_metric.inc(dropped)
+                print(f"Dropped a scrobble Last.fm rejected {self.max_rejections} times")
+                self._backoff = 0.0
+                self._retry_at = 0.0
+                self._split_done(scrobble_id)
+
+    def _split_done(self, last_id):
+        """Back to full batches once everything from the rejected batch is sent or dropped."""
+        if self._split_until is not None and last_id >= self._split_until:
+            self._split_until = None
+            self._batch_limit = self.batch_size
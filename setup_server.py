@@ -5,17 +5,33 @@ When Last.fm credentials are not configured, this module:
 1. Starts a local web server on port 8080
 2. Generates a QR code pointing to the setup page
 3. Serves a mobile-friendly form to enter Last.fm credentials
-4. Saves credentials to config.json on submit
+4. Checks credentials with Last.fm on a worker thread and saves them to
+   config.json; the phone polls a status page meanwhile
+5. Serves runtime metrics at /metrics (Prometheus text) and /metrics.json
+6. Serves the listening history as JSON: /history.json (paged, newest
+   first) and /history/top.json (most played tracks for a date range)
+
+Requests are handled on their own threads, and the static pages are read
+once at startup and served with ETag, Cache-Control and gzip.
 """
 
+import datetime
+import gzip
+import hashlib
+import html
 import json
 import os
+import secrets
 import socket
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs
 
+from history import parse_day
+
 SETUP_PORT = 8080
+MAX_PAGE = 500
 credentials_updated = threading.Event()
 
 
@@ -238,31 +254,267 @@ ERROR_HTML = """<!DOCTYPE html>
 </body>
 </html>"""
 
+PENDING_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta http-equiv="refresh" content="1">
+    <title>ScrobbleDaddy - Checking...</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif;
+            background: linear-gradient(135deg, #0c0c14, #1a0a2e);
+            color: #f0f0f5;
+            min-height: 100vh;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            padding: 20px;
+            text-align: center;
+        }
+        .card {
+            background: rgba(30, 15, 50, 0.9);
+            border: 1px solid rgba(130, 60, 200, 0.3);
+            border-radius: 16px;
+            padding: 40px 30px;
+            width: 100%;
+            max-width: 400px;
+        }
+        .icon { font-size: 48px; margin-bottom: 16px; }
+        h1 { font-size: 22px; margin-bottom: 8px; color: #a855f7; }
+        p { color: #a0a0b5; font-size: 14px; }
+    </style>
+</head>
+<body>
+    <div class="card">
+        <div class="icon">⏳</div>
+        <h1>Checking with Last.fm...</h1>
+        <p>Logging in as <strong>USERNAME</strong>. This page updates by itself.</p>
+    </div>
+</body>
+</html>"""
+
+
+class StaticAsset:
+    """A response body held in memory, with its ETag and a gzipped copy."""
+
+    def __init__(self, body, content_type, cache_control, compress=False):
+        self.body = body
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        self.gzipped = gzip.compress(body, compresslevel=9) if compress else None
+
+
+class ValidationJobs:
+    """Credential checks running off the request threads, by job id."""
+
+    def __init__(self, config_file, executor=None, keep=32):
+        self.config_file = config_file
+        self.executor = executor
+        self.keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._config_lock = threading.Lock()
+
+    def submit(self, username, password):
+        job_id = secrets.token_urlsafe(8)
+        with self._lock:
+            self._jobs[job_id] = {'state': 'pending', 'username': username, 'error': None}
+            while len(self._jobs) > self.keep:
+                self._jobs.popitem(last=False)
+        if self.executor is not None:
+            self.executor.submit(self._validate, job_id, username, password)
+        else:
+            threading.Thread(target=self._validate, args=(job_id, username, password),
+                             daemon=True).start()
+        return job_id
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return None if job is None else dict(job)
+
+    def _finish(self, job_id, state, error=None):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(state=state, error=error)
+
+    def _validate(self, job_id, username, password):
+        # Validate credentials with Last.fm first
+        try:
+            import pylast
+            with open(self.config_file, "r") as f:
+                config = json.load(f)
+            network = pylast.LastFMNetwork(
+                api_key=config['lastfm']['api_key'],
+                api_secret=config['lastfm']['api_secret'],
+                username=username,
+                password_hash=pylast.md5(password),
+            )
+            # Test the connection
+            network.get_authenticated_user().get_name()
+        except Exception as e:
+            print(f"Last.fm validation failed for {username}: {e}")
+            self._finish(job_id, 'error', str(e))
+            return
+
+        # Validation passed — save to config.json (re-read: it may have changed meanwhile)
+        with self._config_lock:
+            with open(self.config_file, "r") as f:
+                config = json.load(f)
+            config["lastfm"]["username"] = username
+            config["lastfm"]["password"] = password
+            with open(self.config_file, "w") as f:
+                json.dump(config, f, indent=4)
+                f.write("\n")
+
+        print(f"Last.fm configured for: {username}")
+        self._finish(job_id, 'ok')
+
+        # Signal the main app
+        credentials_updated.set()
+
+
 class SetupHandler(BaseHTTPRequestHandler):
     config_file = "config.json"
+    metrics = None
+    history = None
+    assets = {}
+    jobs = None
 
     def log_message(self, format, *args):
         pass  # Suppress HTTP logs
 
     def do_GET(self):
-        if self.path == '/logo.png':
-            logo_path = os.path.join(os.path.dirname(self.config_file), 'ScrobbleDaddy.png')
-            try:
-                with open(logo_path, 'rb') as f:
-                    data = f.read()
-                self.send_response(200)
-                self.send_header('Content-Type', 'image/png')
-                self.end_headers()
-                self.wfile.write(data)
-            except FileNotFoundError:
-                self.send_response(404)
-                self.end_headers()
+        path, _, query = self.path.partition('?')
+        if path in ('/metrics', '/metrics.json'):
+            self.send_metrics(path)
+            return
+
+        if path in ('/history.json', '/history/top.json'):
+            self.send_history(path, parse_qs(query))
+            return
+
+        if path == '/status':
+            self.send_status(parse_qs(query).get('job', [''])[0])
+            return
+
+        asset = self.assets.get('/' if path == '/index.html' else path)
+        if asset is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_asset(asset)
+
+    def send_asset(self, asset):
+        if self.headers.get('If-None-Match') == asset.etag:
+            self.send_response(304)
+            self.send_header('ETag', asset.etag)
+            self.send_header('Cache-Control', asset.cache_control)
+            self.end_headers()
+            return
+
+        body = asset.body
+        self.send_response(200)
+        self.send_header('Content-Type', asset.content_type)
+        self.send_header('ETag', asset.etag)
+        self.send_header('Cache-Control', asset.cache_control)
+        if asset.gzipped is not None:
+            self.send_header('Vary', 'Accept-Encoding')
+            if 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = asset.gzipped
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, page):
+        """Send a one-off (uncached) HTML page, gzipped when the client allows."""
+        body = page.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Vary', 'Accept-Encoding')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_status(self, job_id):
+        job = self.jobs.get(job_id) if self.jobs is not None else None
+        if job is None:
+            self.send_response(302)
+            self.send_header("Location", "/")
+            self.end_headers()
+            return
+
+        username = html.escape(job['username'])
+        if job['state'] == 'pending':
+            self.send_html(PENDING_HTML.replace("USERNAME", username))
+        elif job['state'] == 'ok':
+            self.send_html(SUCCESS_HTML.replace("USERNAME", username))
+        else:
+            self.send_html(ERROR_HTML.replace("ERROR_MSG", html.escape(job['error'] or '')))
+
+    def send_metrics(self, path):
+        if self.metrics is None:
+            self.send_response(404)
+            self.end_headers()
             return
 
+        if path == '/metrics.json':
+            body = json.dumps(self.metrics.snapshot()).encode()
+            content_type = 'application/json'
+        else:
+            body = self.metrics.prometheus().encode()
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
         self.send_response(200)
-        self.send_header("Content-Type", "text/html")
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(SETUP_HTML.encode())
+        self.wfile.write(body)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_history(self, path, params):
+        if self.history is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        def param(name, convert=str, default=None):
+            values = params.get(name)
+            return convert(values[0]) if values and values[0] else default
+
+        try:
+            if path == '/history/top.json':
+                limit = max(1, min(param('limit', int, 10), MAX_PAGE))
+                end = param('to', parse_day, datetime.date.today())
+                start = param('from', parse_day, end - datetime.timedelta(days=29))
+                payload = {'from': start.isoformat(), 'to': end.isoformat(),
+                           'tracks': self.history.top(start, end, limit)}
+            else:
+                limit = max(1, min(param('limit', int, 50), MAX_PAGE))
+                payload = self.history.page(limit, before=param('before'), outcome=param('outcome'),
+                                            start=param('from', parse_day), end=param('to', parse_day))
+        except ValueError as e:
+            self.send_json({'error': str(e)}, status=400)
+            return
+        self.send_json(payload)
 
     def do_POST(self):
         content_length = int(self.headers.get("Content-Length", 0))
@@ -273,54 +525,49 @@ class SetupHandler(BaseHTTPRequestHandler):
         password = params.get("password", [""])[0]
 
         if username and password:
-            # Validate credentials with Last.fm first
-            try:
-                import pylast
-                with open(self.config_file, "r") as f:
-                    config = json.load(f)
-                network = pylast.LastFMNetwork(
-                    api_key=config['lastfm']['api_key'],
-                    api_secret=config['lastfm']['api_secret'],
-                    username=username,
-                    password_hash=pylast.md5(password),
-                )
-                # Test the connection
-                network.get_authenticated_user().get_name()
-            except Exception as e:
-                print(f"Last.fm validation failed for {username}: {e}")
-                self.send_response(200)
-                self.send_header("Content-Type", "text/html")
-                self.end_headers()
-                self.wfile.write(ERROR_HTML.replace("ERROR_MSG", str(e)).encode())
-                return
-
-            # Validation passed — save to config.json
-            config["lastfm"]["username"] = username
-            config["lastfm"]["password"] = password
-            with open(self.config_file, "w") as f:
-                json.dump(config, f, indent=4)
-                f.write("\n")
-
-            print(f"Last.fm configured for: {username}")
-
-            # Send success page
-            self.send_response(200)
-            self.send_header("Content-Type", "text/html")
+            # Last.fm is checked on a worker; the phone polls /status meanwhile
+            job_id = self.jobs.submit(username, password)
+            self.send_response(303)
+            self.send_header("Location", f"/status?job={job_id}")
+            self.send_header('Content-Length', '0')
             self.end_headers()
-            html = SUCCESS_HTML.replace("USERNAME", username)
-            self.wfile.write(html.encode())
-
-            # Signal the main app
-            credentials_updated.set()
         else:
             self.send_response(302)
             self.send_header("Location", "/")
             self.end_headers()
 
 
-def generate_qr_surface(url, size=120):
-    """Generate a near-invisible QR code — subtle enough to blend, scannable by camera."""
+def load_assets(config_file):
+    """Read every static response once, at startup."""
+    assets = {
+        '/': StaticAsset(SETUP_HTML.encode(), 'text/html; charset=utf-8', 'no-cache', compress=True),
+    }
+    logo_path = os.path.join(os.path.dirname(config_file), 'ScrobbleDaddy.png')
+    try:
+        with open(logo_path, 'rb') as f:
+            assets['/logo.png'] = StaticAsset(f.read(), 'image/png', 'public, max-age=86400')
+    except FileNotFoundError:
+        pass
+    return assets
+
+
+def generate_qr_surface(url, size=120, cache_dir=None):
+    """Generate a near-invisible QR code — subtle enough to blend, scannable by camera.
+
+    With `cache_dir`, the rendered code is kept as a PNG per URL and size,
+    so later starts load it without importing qrcode/PIL.
+    """
     import pygame
+
+    cache_path = None
+    if cache_dir:
+        key = hashlib.sha1(f"{url}|{size}".encode()).hexdigest()[:16]
+        cache_path = os.path.join(cache_dir, f"qr-{key}.png")
+        try:
+            return pygame.image.load(cache_path)
+        except (pygame.error, FileNotFoundError):
+            pass
+
     try:
         import qrcode
         qr = qrcode.QRCode(box_size=6, border=1)
@@ -333,18 +580,30 @@ def generate_qr_surface(url, size=120):
 
         raw = img.convert("RGB").tobytes()
         surface = pygame.image.fromstring(raw, (size, size), "RGB")
-        return surface
     except ImportError:
         return None
 
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            pygame.image.save(surface, cache_path)
+        except (pygame.error, OSError) as e:
+            print(f"Could not cache QR code: {e}")
+    return surface
+
 
-def start_setup_server(config_file="config.json"):
+def start_setup_server(config_file="config.json", metrics=None, executor=None, history=None):
     """Start the setup web server and return the URL."""
     SetupHandler.config_file = config_file
+    SetupHandler.metrics = metrics
+    SetupHandler.history = history
+    SetupHandler.assets = load_assets(config_file)
+    SetupHandler.jobs = ValidationJobs(config_file, executor=executor)
     ip = get_local_ip()
     url = f"http://{ip}:{SETUP_PORT}"
 
-    server = HTTPServer(("0.0.0.0", SETUP_PORT), SetupHandler)
+    server = ThreadingHTTPServer(("0.0.0.0", SETUP_PORT), SetupHandler)
+    server.daemon_threads = True
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
 
@@ -0,0 +1,203 @@
+"""
+ScrobbleDaddy - Band Aggregation
+
+Turns one window of audio into NUM_BARS log-spaced band magnitudes with a
+single precomputed operator instead of a Python loop over index arrays:
+
+1. Bin edges are computed once from `rfftfreq` (the spectrum is an rfft)
+2. Each frame is windowed, transformed, and summed per band with one
+   `np.add.reduceat` call, every step writing into preallocated buffers
+   (the rfft too on NumPy 2.0+, where it takes `out=`)
+
+SpectrumAnalyzer runs that operator as an overlapping STFT at a fixed hop,
+off the render loop, and smooths the bands per hop (attack/release, peak
+hold, a running gain) so every frame just reads the newest result.
+
+Decimator is the capture front end for the visualizer: a streaming
+low-pass + downsample, so the bars FFT a smaller, lower-rate signal.
+"""
+
+import inspect
+
+import numpy as np
+
+# NumPy 2.0+ can write the rfft into a caller's buffer
+_RFFT_OUT = 'out' in inspect.signature(np.fft.rfft).parameters
+
+WINDOWS = {
+    None: np.ones,
+    'rect': np.ones,
+    'hann': np.hanning,
+    'hamming': np.hamming,
+    'blackman': np.blackman,
+}
+
+
+class BandAggregator:
+    """Precomputed rfft → log-band operator for a fixed window size."""
+
+    def __init__(self, n_samples, sample_rate, num_bars, f_min=200, window='hann', dtype=np.float32):
+        self.n_samples = n_samples
+        self.sample_rate = sample_rate
+        self.num_bars = num_bars
+        self.dtype = np.dtype(dtype)
+
+        freqs = np.fft.rfftfreq(n_samples, 1 / sample_rate)
+        edges_hz = np.logspace(np.log10(f_min), np.log10(sample_rate // 2), num_bars + 1)
+
+        # Band i sums bins [edges[i], edges[i + 1]), matching the old
+        # `freqs >= lo & freqs < hi` masks
+        edges = np.searchsorted(freqs, edges_hz, side='left')
+        self.bin_edges = edges
+        self._empty = edges[:-1] >= edges[1:]
+        self._indices = np.minimum(edges, len(freqs) - 1)
+
+        self._window = WINDOWS[window](n_samples).astype(self.dtype)
+        self._frame = np.empty(n_samples, dtype=self.dtype)
+        self._spectrum = np.empty(len(freqs), dtype=np.result_type(self.dtype, np.complex64))
+        self._magnitudes = np.empty(len(freqs), dtype=self.dtype)
+        self._sums = np.empty(len(self._indices), dtype=self.dtype)
+        self._bands = self._sums[:num_bars]
+
+    def __call__(self, samples):
+        """Return band magnitudes for one window of `n_samples` samples.
+
+        The result is a view of an internal buffer, overwritten by the next call.
+        """
+        np.multiply(samples, self._window, out=self._frame)
+        if _RFFT_OUT:
+            spectrum = np.fft.rfft(self._frame, out=self._spectrum)
+        else:
+            spectrum = np.fft.rfft(self._frame)
+        np.abs(spectrum, out=self._magnitudes, casting='same_kind')
+        np.add.reduceat(self._magnitudes, self._indices, out=self._sums)
+        self._bands[self._empty] = 0
+        return self._bands
+
+
+class SpectrumAnalyzer:
+    """Fixed-hop STFT of an audio ring, smoothed per hop; frames only read.
+
+    Every `hop` samples the newest `n_samples` (so windows overlap by
+    `n_samples - hop`) go through a BandAggregator, then, in one vectorized
+    pass over the bands:
+
+    1. A running gain — the loudest recent band, released over
+       `gain_release` seconds — scales bands to 0..1, instead of stretching
+       every frame to its own maximum
+    2. Levels rise with the `attack` time constant and fall with `release`
+    3. Peaks hold for `peak_hold` seconds, then fall `peak_fall` per second
+
+    Times are in seconds, so the bars move the same at any hop size or
+    frame rate. `update()` is the writer (one thread); `latest()` hands
+    any reader the newest (levels, peaks) pair without copying.
+    """
+
+    def __init__(self, n_samples, sample_rate, num_bars, hop, attack=0.02, release=0.25,
+                 peak_hold=0.5, peak_fall=1.5, gain_release=5.0, floor_db=-60, max_backlog=8):
+        self.sample_rate = sample_rate
+        self.hop = hop
+        self.max_backlog = max_backlog
+        self.hops = 0
+
+        dt = hop / sample_rate
+        self._attack = 1 - np.exp(-dt / attack) if attack > 0 else 1.0
+        self._release = 1 - np.exp(-dt / release) if release > 0 else 1.0
+        self._gain_decay = np.exp(-dt / gain_release)
+        self._hold_hops = int(round(peak_hold / dt))
+        self._fall = peak_fall * dt
+        self._floor = 10 ** (floor_db / 20)
+
+        self.n_samples = self.num_bars = None
+        self._want = (n_samples, num_bars)
+        self._next = None  # Sample position the next window ends at
+        self._apply(n_samples, num_bars)
+
+    def configure(self, num_bars, n_samples):
+        """Switch bar count / window size; applied by the writer on its next update."""
+        self._want = (n_samples, num_bars)
+
+    def _apply(self, n_samples, num_bars):
+        if num_bars != self.num_bars:
+            self._levels = np.zeros(num_bars, dtype=np.float32)
+            self._peaks = np.zeros(num_bars, dtype=np.float32)
+            self._hold = np.zeros(num_bars, dtype=np.int32)
+            self._latest = (self._levels.copy(), self._peaks.copy())
+        self.aggregator = BandAggregator(n_samples, self.sample_rate, num_bars)
+        self.n_samples = n_samples
+        self.num_bars = num_bars
+        # A full-scale sine through the Hann window peaks at n / 4 per bin
+        self._min_gain = n_samples * 32768 / 4 * self._floor
+        self._gain = self._min_gain
+
+    def update(self, source):
+        """Analyze every hop `source` has gained since the last call; returns the count."""
+        if self._want != (self.n_samples, self.num_bars):
+            self._apply(*self._want)
+
+        written = source.samples_written
+        if self._next is None:
+            self._next = written
+        elif written - self._next > self.max_backlog * self.hop:
+            # Fell behind (a stall, or nobody reading): skip to the newest hops
+            self._next = written - (self.max_backlog - 1) * self.hop
+
+        hops = 0
+        while self._next <= written:
+            window = source.window_at(self._next, self.n_samples)
+            self._next += self.hop
+            if window is not None:
+                self._step(self.aggregator(window))
+                hops += 1
+        if hops:
+            self.hops += hops
+            self._latest = (self._levels.copy(), self._peaks.copy())
+        return hops
+
+    def _step(self, bands):
+        self._gain = max(float(bands.max()), self._gain * self._gain_decay, self._min_gain)
+        target = np.minimum(bands / self._gain, 1.0)
+
+        levels = self._levels
+        levels += np.where(target > levels, self._attack, self._release) * (target - levels)
+
+        caught = levels >= self._peaks
+        self._hold = np.where(caught, self._hold_hops, self._hold - 1)
+        falling = np.maximum(self._peaks - self._fall, levels)
+        self._peaks = np.where(caught, levels, np.where(self._hold < 0, falling, self._peaks))
+
+    def latest(self):
+        """Newest (levels, peaks), each 0..1 per bar."""
+        return self._latest
+
+    def run(self, source, stop):
+        """Update every hop until `stop` is set or `source` closes (a thread target)."""
+        while not stop.is_set() and not source.closed:
+            if source.wait_for(self.hop, timeout=0.25):
+                self.update(source)
+
+
+class Decimator:
+    """Streaming anti-aliased downsampler for int16 audio.
+
+    A windowed-sinc low-pass (cutoff just under the new Nyquist) evaluated
+    only at the kept samples; filter history and phase carry across blocks,
+    so any block size gives the same output as one long signal.
+    """
+
+    def __init__(self, factor, taps_per_factor=16, cutoff=0.9):
+        self.factor = factor
+        n_taps = taps_per_factor * factor + 1
+        t = np.arange(n_taps) - (n_taps - 1) / 2
+        taps = np.sinc(cutoff / factor * t) * np.blackman(n_taps)
+        self.taps = (taps / taps.sum()).astype(np.float32)  # Symmetric: no flip needed
+        self._history = np.zeros(n_taps - 1, dtype=np.float32)
+        self._phase = 0  # Offset of the next kept sample in the next block
+
+    def __call__(self, samples):
+        x = np.concatenate((self._history, samples.astype(np.float32)))
+        windows = np.lib.stride_tricks.sliding_window_view(x, len(self.taps))
+        out = windows[self._phase::self.factor] @ self.taps
+        self._phase = (self._phase - len(samples)) % self.factor
+        self._history = x[len(x) - len(self._history):].copy()
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
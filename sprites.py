@@ -0,0 +1,60 @@
+"""
+ScrobbleDaddy - Rotation Sprites
+
+Pre-renders a surface at N evenly spaced angles so spinning it costs one
+blit per frame, with no per-frame rotation or surface allocation:
+
+1. Frames are built once per source surface (e.g. once per album) on a
+   worker thread, then swapped in whole
+2. Every frame is cropped back to the source size around its center, so
+   all frames share one blit position
+"""
+
+import threading
+
+
+class RotationSprites:
+    """Angle-indexed cache of smoothly rotated copies of one surface."""
+
+    def __init__(self, frames=90):
+        self.count = frames
+        self._frames = None
+        self._source = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def build(self, source, executor=None):
+        """Start building frames for `source`; shows it unrotated meanwhile."""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._source = source
+            self._frames = None
+        # The worker rotates its own copy; pygame locks a surface while
+        # transforming it, and the render thread keeps blitting `source`
+        if executor is None:
+            self._build(source, generation)
+        else:
+            executor.submit(self._build, source.copy(), generation)
+
+    def _build(self, source, generation):
+        import pygame
+
+        size = source.get_size()
+        frames = []
+        for i in range(self.count):
+            rotated = pygame.transform.rotozoom(source, 360.0 * i / self.count, 1)
+            frame = pygame.Surface(size, pygame.SRCALPHA)
+            frame.blit(rotated, rotated.get_rect(center=(size[0] // 2, size[1] // 2)))
+            frames.append(frame)
+
+        with self._lock:
+            if generation == self._generation:
+                self._frames = frames
+
+    def frame(self, angle):
+        """Return the pre-rendered frame nearest to `angle` degrees."""
+        frames = self._frames
+        if frames is None:
+            return self._source
+        return frames[int(round(angle * self.count / 360.0)) % self.count]
@@ -0,0 +1,96 @@
+"""
+ScrobbleDaddy - Startup Timing
+
+Times each startup phase so slow boots can be pinned on a subsystem:
+
+1. Phases on the main thread are consecutive `mark()`s, up to the first frame
+2. Background phases (audio, Last.fm, setup server, ...) time themselves
+   with `phase()` and may finish after the first frame
+3. `report()` prints one table once the first frame is up and every
+   background phase has finished, flagging a first frame over budget
+"""
+
+import threading
+import time
+
+
+class StartupTimer:
+    """Per-phase startup durations, relative to process start."""
+
+    def __init__(self, start=None, budget=1.5):
+        self.start = time.perf_counter() if start is None else start
+        self.budget = budget
+        self.first_frame = None
+        self._last = self.start
+        self._phases = []  # (name, started_at, seconds, background)
+        self._running = 0
+        self._reported = False
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        """End a main-thread phase that began at the previous mark."""
+        now = time.perf_counter()
+        with self._lock:
+            self._phases.append((name, self._last - self.start, now - self._last, False))
+        self._last = now
+
+    def phase(self, name):
+        """Context manager timing a background phase."""
+        return _Phase(self, name)
+
+    def hold(self):
+        """Hold the report back until the matching release() (e.g. a thread still to run)."""
+        with self._lock:
+            self._running += 1
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+        self._maybe_report()
+
+    def _record(self, name, started, seconds):
+        with self._lock:
+            self._phases.append((name, started - self.start, seconds, True))
+
+    def frame_shown(self):
+        """Call after the first frame is on screen."""
+        if self.first_frame is not None:
+            return
+        self.mark('first frame')
+        self.first_frame = time.perf_counter() - self.start
+        if self.first_frame > self.budget:
+            print(f"First frame took {self.first_frame * 1000:.0f}ms "
+                  f"(budget {self.budget * 1000:.0f}ms)")
+        self._maybe_report()
+
+    def _maybe_report(self):
+        with self._lock:
+            if self._reported or self.first_frame is None or self._running:
+                return
+            self._reported = True
+        self.report()
+
+    def report(self):
+        with self._lock:
+            phases = sorted(self._phases, key=lambda p: p[1])
+        ready = max(started + seconds for _name, started, seconds, _bg in phases)
+        print(f"Startup: first frame at {self.first_frame * 1000:.0f}ms "
+              f"(budget {self.budget * 1000:.0f}ms), everything ready at {ready * 1000:.0f}ms")
+        for name, started, seconds, background in phases:
+            where = "background" if background else "main"
+            print(f"  {name:<20} {seconds * 1000:>7.0f}ms  at {started * 1000:>6.0f}ms  ({where})")
+
+
+class _Phase:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.timer.hold()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer._record(self.name, self.started, time.perf_counter() - self.started)
+        self.timer.release()
@@ -0,0 +1,67 @@
+"""
+ScrobbleDaddy - Text Strips
+
+Title and artist text is rasterized once per track into a strip surface,
+and scrolling moves a pixel-offset window across that strip:
+
+1. TextStripCache holds a bounded number of rendered strips (LRU)
+2. TextScroller advances the window by frame time: hold, scroll, hold, reset
+"""
+
+from collections import OrderedDict
+
+
+class TextStripCache:
+    """Bounded LRU of pre-rendered text surfaces."""
+
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._strips = OrderedDict()
+
+    def get(self, font, text, color):
+        key = (id(font), text, color)
+        strip = self._strips.get(key)
+        if strip is not None:
+            self._strips.move_to_end(key)
+            return strip
+        strip = font.render(text, True, color)
+        self._strips[key] = strip
+        while len(self._strips) > self.max_entries:
+            self._strips.popitem(last=False)
+        return strip
+
+
+class TextScroller:
+    """Pixel scroll position for one strip shown through a fixed-width view."""
+
+    HOLD_START, SCROLL, HOLD_END = range(3)
+
+    def __init__(self, view_width, speed=70.0, hold=3.0):
+        self.view_width = view_width
+        self.speed = speed
+        self.hold = hold
+        self.reset()
+
+    def reset(self):
+        self.offset = 0.0
+        self._phase = self.HOLD_START
+        self._timer = 0.0
+
+    def advance(self, dt, strip_width):
+        """Move the window on by `dt` seconds; returns the whole-pixel offset."""
+        overflow = strip_width - self.view_width
+        if overflow <= 0:
+            self.reset()
+            return 0
+
+        self._timer += dt
+        if self._phase == self.HOLD_START:
+            if self._timer >= self.hold:
+                self._phase, self._timer = self.SCROLL, 0.0
+        elif self._phase == self.SCROLL:
+            self.offset = min(overflow, self.offset + self.speed * dt)
+            if self.offset >= overflow:
+                self._phase, self._timer = self.HOLD_END, 0.0
+        elif self._timer >= self.hold:
+            self.reset()
+        return int(self.offset)
@@ -0,0 +1,99 @@
+"""
+ScrobbleDaddy - Track Change Detection
+
+Watches the band levels the visualizer already computes, plus the input
+level, for signs that a new track has started, so recognition can run right
+away instead of at the next scheduled check:
+
+1. Spectral novelty: a short-term average of the band shape (compressed and
+   centred, so loudness and the visualizer's gain don't matter) drifting
+   away from the long-term one for `novelty_seconds`
+2. A silence gap: at least `gap_seconds` below `silence_rms`, then sound
+3. After a trigger the long-term average restarts from the new sound, and
+   nothing fires again for `cooldown` seconds
+
+Time constants are in seconds, so it behaves the same at any frame rate;
+`observe()` is a few vector operations on NUM_BARS values.
+"""
+
+import math
+
+import numpy as np
+
+
+class TrackChangeDetector:
+    """Spectral-novelty and silence-gap detector for track boundaries."""
+
+    def __init__(self, silence_rms=150, novelty=0.3, novelty_seconds=1.0, gap_seconds=0.8,
+                 cooldown=20.0, short_tau=2.0, long_tau=20.0):
+        self.silence_rms = silence_rms
+        self.threshold = novelty
+        self.novelty_seconds = novelty_seconds
+        self.gap_seconds = gap_seconds
+        self.cooldown = cooldown
+        self.short_tau = short_tau
+        self.long_tau = long_tau
+
+        self.novelty = 0.0  # Latest value, for logs and tuning
+        self.changes = {'novelty': 0, 'gap': 0}
+        self._fired_at = None
+        self._last = None
+        self.reset()
+
+    def reset(self):
+        """Forget the sound so far (e.g. after the bar count changes)."""
+        self._short = self._long = None
+        self._started = None
+        self._novel_since = None
+        self._quiet_since = None
+        self._gap = False
+
+    def observe(self, bands, rms, now):
+        """Feed one frame; returns 'novelty' or 'gap' when a new track is likely, else None."""
+        dt = 0.0 if self._last is None else min(max(now - self._last, 0.0), 1.0)
+        self._last = now
+
+        if rms < self.silence_rms:
+            if self._quiet_since is None:
+                self._quiet_since = now
+            if now - self._quiet_since >= self.gap_seconds:
+                self._gap = True
+            return None  # Silence says nothing about the spectrum
+        self._quiet_since = None
+        if self._gap:
+            self._gap = False
+            self.reset()
+            return self._fire('gap', now)
+
+        shape = np.sqrt(np.maximum(bands, 0.0))
+        shape -= shape.mean()
+        if self._short is None or len(self._short) != len(shape):
+            self._short = shape.copy()
+            self._long = shape.copy()
+            self._started = now
+            return None
+
+        self._short += (1 - math.exp(-dt / self.short_tau)) * (shape - self._short)
+        self._long += (1 - math.exp(-dt / self.long_tau)) * (shape - self._long)
+        norm = float(np.linalg.norm(self._short) * np.linalg.norm(self._long))
+        self.novelty = 1 - float(np.dot(self._short, self._long)) / norm if norm > 0 else 0.0
+
+        # Both averages need a moment to mean anything after a (re)start
+        if now - self._started < 2 * self.short_tau or self.novelty < self.threshold:
+            self._novel_since = None
+            return None
+        if self._novel_since is None:
+            self._novel_since = now
+        if now - self._novel_since < self.novelty_seconds:
+            return None
+        return self._fire('novelty', now)
+
+    def _fire(self, reason, now):
+        self._novel_since = None
+        if self._fired_at is not None and now - self._fired_at < self.cooldown:
+            return None
+        self._fired_at = now
+        if self._short is not None:
+            self._long = self._short.copy()  # The new track is the baseline now
+        self.changes[reason] += 1
+        return reason